@@ -0,0 +1,311 @@
+"""
+Seed quality analysis for the Procedurally-Generated 2D Role-Playing Game.
+
+Generation places water, chests and enemies independently, so a seed can
+produce a map whose chests or enemies sit on water or on an island the player
+cannot walk to. This module labels the water bodies and walkable regions of a
+map with connected-component labeling, checks that every chest and enemy can
+be reached from the main walkable region, and re-rolls seeds whose maps
+cannot, within a time budget.
+
+Usage (from the repository root):
+    python Game_Code/analysis.py 42 1234 --lakes
+"""
+import time
+
+import numpy as np
+
+from engine import ENEMY_SIZE, OBJECT_SIZE
+from generation import TILE_SIZE, WATER, generate_world, stream
+from rooms import clear_exits
+
+MIN_MAIN_REGION_SHARE = 0.8  # Share of the walkable tiles the main region must hold
+REROLL_BUDGET_MS = 50  # Time allowed for re-rolling a seed before settling for the best map
+
+
+def label_regions(mask):
+    """
+    Labels the 4-connected regions of a boolean grid.
+
+    Every tile starts labelled with its own index. The labels are then
+    repeatedly lowered to the smallest label among each tile's neighbours
+    in the region, with pointer jumping (each label replaced by the label of
+    the tile it names) so long regions converge in a few passes instead of
+    one pass per tile of their length. Each pass is a handful of whole-grid
+    array operations.
+
+    Args:
+        mask (numpy.ndarray): Boolean grid of the tiles to label.
+
+    Returns:
+        tuple: (labels, count). labels is an int32 grid numbering the regions
+        from 1 to count, in row-major order of their first tile, and 0 where
+        mask is False.
+    """
+    rows, cols = mask.shape
+    size = rows * cols
+    # Tiles outside the mask hold size, which is larger than every real label
+    labels = np.where(mask, np.arange(size).reshape(rows, cols), size)
+    while True:
+        lowered = labels.copy()
+        np.minimum(lowered[1:], labels[:-1], out=lowered[1:])  # From the tile above
+        np.minimum(lowered[:-1], labels[1:], out=lowered[:-1])  # From the tile below
+        np.minimum(lowered[:, 1:], labels[:, :-1], out=lowered[:, 1:])  # From the left
+        np.minimum(lowered[:, :-1], labels[:, 1:], out=lowered[:, :-1])  # From the right
+        lowered[~mask] = size
+        # Jump to the label of the tile each label names
+        lookup = np.append(lowered.ravel(), size)
+        lowered = lookup[lowered]
+        if np.array_equal(lowered, labels):
+            break
+        labels = lowered
+
+    # Renumber the regions 1..count; the background (size) sorts last
+    roots, numbered = np.unique(labels, return_inverse=True)
+    count = len(roots) - (not mask.all())
+    numbered = numbered.reshape(rows, cols).astype(np.int32) + 1
+    numbered[~mask] = 0
+    return numbered, count
+
+
+def sprite_tiles(positions, sprite_size, shape):
+    """
+    Gets the tiles under the corners of a batch of sprites.
+
+    Sprites are smaller than two tiles across, so their corners cover every
+    tile they overlap.
+
+    Args:
+        positions (numpy.ndarray): (N, 2) top-left pixel positions.
+        sprite_size (tuple): Width and height of the sprites in pixels.
+        shape (tuple): (rows, cols) of the terrain grid.
+
+    Returns:
+        tuple: (rows, cols) arrays of shape (N, 4), clipped to the grid.
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    corners_x = positions[:, :1] + np.array([0, sprite_size[0] - 1, 0, sprite_size[0] - 1])
+    corners_y = positions[:, 1:] + np.array([0, 0, sprite_size[1] - 1, sprite_size[1] - 1])
+    rows = np.clip(corners_y // TILE_SIZE[1], 0, shape[0] - 1).astype(np.intp)
+    cols = np.clip(corners_x // TILE_SIZE[0], 0, shape[1] - 1).astype(np.intp)
+    return rows, cols
+
+
+class MapReport:
+    """
+    How playable a generated map is.
+
+    The main region is the largest walkable region. A chest or enemy counts
+    as reachable if any tile under its sprite belongs to the main region.
+
+    Attributes:
+        seed (int): Seed of the map
+        water_coverage (float): Share of the tiles that are water
+        water_bodies (int): Number of separate bodies of water
+        regions (int): Number of separate walkable regions
+        largest_region (int): Tiles in the main region
+        largest_share (float): Share of the walkable tiles in the main region
+        objects (int): Number of chests
+        reachable_objects (int): Chests reachable from the main region
+        enemies (int): Number of living enemies
+        reachable_enemies (int): Living enemies reachable from the main region
+        exits_reachable (bool): Whether every room exit is in the main region
+            (always True for maps that are not rooms)
+    """
+    def __init__(self, seed, water_coverage, water_bodies, regions, largest_region,
+                 largest_share, objects, reachable_objects, enemies, reachable_enemies,
+                 exits_reachable=True):
+        """
+        Initializes a report from the measured values.
+
+        Args:
+            seed (int): Seed of the map.
+            water_coverage (float): Share of the tiles that are water.
+            water_bodies (int): Number of separate bodies of water.
+            regions (int): Number of separate walkable regions.
+            largest_region (int): Tiles in the main region.
+            largest_share (float): Share of the walkable tiles in the main region.
+            objects (int): Number of chests.
+            reachable_objects (int): Chests reachable from the main region.
+            enemies (int): Number of living enemies.
+            reachable_enemies (int): Living enemies reachable from the main region.
+            exits_reachable (bool): Whether every room exit is in the main region.
+        """
+        self.seed = seed
+        self.water_coverage = water_coverage
+        self.water_bodies = water_bodies
+        self.regions = regions
+        self.largest_region = largest_region
+        self.largest_share = largest_share
+        self.objects = objects
+        self.reachable_objects = reachable_objects
+        self.enemies = enemies
+        self.reachable_enemies = reachable_enemies
+        self.exits_reachable = exits_reachable
+
+    @property
+    def playable(self):
+        """
+        Whether the map is fit to be played.
+
+        Returns:
+            bool: True if every chest, enemy and exit can be reached and the
+            main region holds at least MIN_MAIN_REGION_SHARE of the walkable
+            tiles.
+        """
+        return (self.reachable_objects == self.objects and
+                self.reachable_enemies == self.enemies and
+                self.exits_reachable and
+                self.largest_share >= MIN_MAIN_REGION_SHARE)
+
+    def score(self):
+        """
+        Ranks maps that are not playable, to settle for the best one.
+
+        Returns:
+            tuple: Higher is better.
+        """
+        unreachable = (self.objects - self.reachable_objects +
+                       self.enemies - self.reachable_enemies)
+        return (self.playable, self.exits_reachable, -unreachable, self.largest_share)
+
+    def summary(self):
+        """
+        Describes the report in one line.
+
+        Returns:
+            str: Human-readable summary.
+        """
+        return (f"seed {self.seed}: {'playable' if self.playable else 'unplayable'}, "
+                f"chests {self.reachable_objects}/{self.objects} reachable, "
+                f"enemies {self.reachable_enemies}/{self.enemies} reachable, "
+                f"water {self.water_coverage:.0%} in {self.water_bodies} bodies, "
+                f"main region {self.largest_region} tiles "
+                f"({self.largest_share:.0%} of {self.regions} region(s))")
+
+
+def analyze_world(world, exits=False):
+    """
+    Measures how playable a map is.
+
+    Args:
+        world (World): Map to analyze. It is not modified.
+        exits (bool): Analyze the map as a room: water in front of the exits
+            is cleared as the room graph does, and the exits must be reachable.
+
+    Returns:
+        MapReport: The map's report.
+    """
+    terrain = world.terrain
+    if exits:
+        terrain = terrain.copy()
+        clear_exits(terrain)
+    water = terrain == WATER
+    walkable = ~water
+    water_labels, water_bodies = label_regions(water)
+    labels, regions = label_regions(walkable)
+
+    # The main region is the largest walkable one
+    sizes = np.bincount(labels.ravel(), minlength=regions + 1)[1:]
+    main = int(np.argmax(sizes)) + 1 if regions else 0
+    largest = int(sizes[main - 1]) if regions else 0
+    in_main = labels == main
+
+    rows, cols = sprite_tiles(world.object_positions, OBJECT_SIZE, terrain.shape)
+    reachable_objects = int(in_main[rows, cols].any(axis=1).sum())
+    enemies = world.enemies
+    living = enemies.positions[enemies.alive]
+    rows, cols = sprite_tiles(living, ENEMY_SIZE, terrain.shape)
+    reachable_enemies = int(in_main[rows, cols].any(axis=1).sum())
+
+    exits_reachable = True
+    if exits:
+        grid_rows, grid_cols = terrain.shape
+        exit_tiles = ((grid_rows // 2, 0), (0, grid_cols // 2),
+                      (grid_rows - 1, grid_cols // 2), (grid_rows // 2, grid_cols - 1))
+        exits_reachable = all(in_main[tile] for tile in exit_tiles)
+
+    return MapReport(world.seed, float(water.mean()), water_bodies, regions, largest,
+                     largest / max(int(walkable.sum()), 1),
+                     len(world.object_positions), reachable_objects,
+                     len(living), reachable_enemies, exits_reachable)
+
+
+def reroll_seed(seed, attempt):
+    """
+    Derives the seed to try after a seed's map was rejected.
+
+    Args:
+        seed (int): Seed that was asked for.
+        attempt (int): Number of the re-roll, from 1.
+
+    Returns:
+        int: A short (at most 5 digit) seed.
+    """
+    return stream(seed, "reroll", attempt).randrange(100000)
+
+
+def find_playable_world(seed, lakes=False, exits=False, budget_ms=REROLL_BUDGET_MS):
+    """
+    Generates the map of a seed, re-rolling the seed until the map is playable.
+
+    Seeds are re-rolled deterministically from the first seed. If no playable
+    map turns up within the time budget, the best map found is returned, so
+    this never takes much longer than the budget.
+
+    Args:
+        seed (int): Seed to try first.
+        lakes (bool): Generate lakes and pools instead of square clusters.
+        exits (bool): Analyze the maps as rooms (see analyze_world).
+        budget_ms (float): Time allowed for re-rolling, in milliseconds.
+
+    Returns:
+        tuple: (World, MapReport) of the chosen map. Its seed is world.seed.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000
+    best = None
+    attempt = 0
+    while True:
+        world = generate_world(seed if not attempt else reroll_seed(seed, attempt), lakes)
+        report = analyze_world(world, exits)
+        if best is None or report.score() > best[1].score():
+            best = (world, report)
+        attempt += 1
+        if report.playable or time.perf_counter() >= deadline:
+            return best
+
+
+def main(argv=None):
+    """
+    Analyzes the maps of some seeds and prints their reports.
+
+    Args:
+        argv (list): Command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit status: 1 if any map is unplayable, otherwise 0.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report how playable the maps of seeds are")
+    parser.add_argument("seeds", type=int, nargs="+", help="seeds to analyze")
+    parser.add_argument("--lakes", action="store_true",
+                        help="analyze the lake maps made with Enter instead of the first map")
+    parser.add_argument("--rooms", action="store_true",
+                        help="also require the room exits to be reachable")
+    args = parser.parse_args(argv)
+
+    status = 0
+    for seed in args.seeds:
+        start = time.perf_counter()
+        report = analyze_world(generate_world(seed, args.lakes), args.rooms)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{report.summary()} [{elapsed:.2f} ms]")
+        if not report.playable:
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Infinite chunked world for the Procedurally-Generated 2D Role-Playing Game.
+
+The world is split into square chunks of tiles. Each chunk is generated on
+demand from the world seed and its chunk coordinates, so it comes out the same
+every time it is generated. Only a bounded number of chunks is kept in memory;
+the least recently used ones are dropped and regenerated when revisited.
+"""
+from collections import OrderedDict
+
+from enemies import EnemyStore
+from generation import (ENEMY_HP, GRASS, TILE_SIZE, WATER, FreeTiles, World, add_outlines,
+                        new_terrain, stamp_lakes, stream)
+
+CHUNK_TILES = 16  # Chunk width and height in tiles
+MAX_CHUNKS = 64  # Chunks kept in memory before the least recently used is dropped
+
+
+class Chunk(World):
+    """
+    One square piece of the infinite world.
+
+    A chunk holds the same content as a World (terrain, objects and enemies),
+    with object and enemy positions in world pixel coordinates.
+
+    Attributes:
+        cx (int): Chunk column
+        cy (int): Chunk row
+        origin (tuple): World pixel position of the chunk's top-left corner
+    """
+    def __init__(self, seed, cx, cy, terrain, object_positions, enemies):
+        """
+        Initializes a chunk from generated content.
+
+        Args:
+            seed (int): World seed.
+            cx (int): Chunk column.
+            cy (int): Chunk row.
+            terrain (numpy.ndarray): Grid of terrain kinds for this chunk.
+            object_positions (list): (x, y) world pixel position of each object.
+            enemies (EnemyStore): Enemies in this chunk.
+        """
+        super().__init__(seed, terrain, object_positions, enemies, lakes=True)
+        self.cx = cx
+        self.cy = cy
+        rows, cols = terrain.shape
+        self.origin = (cx * cols * TILE_SIZE[0], cy * rows * TILE_SIZE[1])
+
+
+def generate_chunk(seed, cx, cy, size=CHUNK_TILES):
+    """
+    Generates one chunk of the infinite world.
+
+    Every stage draws from a stream derived from the world seed and the chunk
+    coordinates. Water is kept one tile away from the chunk's edges so its
+    outline never depends on neighbouring chunks.
+
+    Args:
+        seed (int): World seed.
+        cx (int): Chunk column.
+        cy (int): Chunk row.
+        size (int): Chunk width and height in tiles.
+
+    Returns:
+        Chunk: The generated chunk.
+    """
+    terrain = new_terrain(size, size)
+    stamp_lakes(terrain, stream(seed, "terrain", cx, cy), margin=1)
+    if (cx, cy) == (0, 0):
+        terrain[:4, :4] = GRASS  # Keep the player's starting area dry
+    add_outlines(terrain)
+
+    origin_col, origin_row = cx * size, cy * size
+    free_tiles = FreeTiles(terrain)
+
+    # Generate 0-2 objects per chunk on free tiles, in world pixel coordinates
+    rng = stream(seed, "objects", cx, cy)
+    object_positions = []
+    for _ in range(rng.randint(0, 2)):
+        row, col = free_tiles.sample(rng)
+        object_positions.append(((origin_col + col) * TILE_SIZE[0],
+                                 (origin_row + row) * TILE_SIZE[1]))
+
+    # Generate 0-2 enemies per chunk on free tiles, in world pixel coordinates
+    rng = stream(seed, "enemies", cx, cy)
+    enemy_positions = []
+    for _ in range(rng.randint(0, 2)):
+        row, col = free_tiles.sample(rng)
+        enemy_positions.append(((origin_col + col) * TILE_SIZE[0],
+                                (origin_row + row) * TILE_SIZE[1]))
+    enemies = EnemyStore()
+    enemies.spawn(enemy_positions, ENEMY_HP)
+
+    return Chunk(seed, cx, cy, terrain, object_positions, enemies)
+
+
+class ChunkWorld:
+    """
+    An endless world made of chunks that are generated around the player.
+
+    Chunks are kept in a least-recently-used cache of bounded size, so memory
+    use stays flat no matter how far the player walks. A dropped chunk is
+    regenerated identically from the seed when it is needed again (changes
+    such as opened chests are not kept).
+
+    Attributes:
+        seed (int): World seed
+        size (int): Chunk width and height in tiles
+        max_chunks (int): Maximum number of chunks kept in memory
+        chunks (collections.OrderedDict): Loaded chunks by (cx, cy), least
+            recently used first
+    """
+    def __init__(self, seed, size=CHUNK_TILES, max_chunks=MAX_CHUNKS):
+        """
+        Initializes an empty chunk world.
+
+        Args:
+            seed (int): World seed.
+            size (int): Chunk width and height in tiles.
+            max_chunks (int): Maximum number of chunks kept in memory.
+        """
+        self.seed = seed
+        self.size = size
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+
+    def get(self, cx, cy):
+        """
+        Gets a chunk, generating it if it is not loaded.
+
+        Args:
+            cx (int): Chunk column.
+            cy (int): Chunk row.
+
+        Returns:
+            Chunk: The chunk at those coordinates.
+        """
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = generate_chunk(self.seed, cx, cy, self.size)
+            self.chunks[key] = chunk
+            # Drop the least recently used chunks once over the limit
+            while len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    def chunk_at(self, x, y):
+        """
+        Gets the coordinates of the chunk containing a world pixel position.
+
+        Args:
+            x (float): World x-coordinate in pixels.
+            y (float): World y-coordinate in pixels.
+
+        Returns:
+            tuple: (cx, cy) chunk coordinates.
+        """
+        return (int(x // (self.size * TILE_SIZE[0])), int(y // (self.size * TILE_SIZE[1])))
+
+    def around(self, x, y, radius=1):
+        """
+        Gets the chunks within a number of chunks of a world pixel position.
+
+        Args:
+            x (float): World x-coordinate in pixels.
+            y (float): World y-coordinate in pixels.
+            radius (int): How many chunks to include in each direction.
+
+        Returns:
+            list: Chunks in a (2 * radius + 1) square centered on the position.
+        """
+        cx, cy = self.chunk_at(x, y)
+        return [self.get(cx + i, cy + j)
+                for j in range(-radius, radius + 1)
+                for i in range(-radius, radius + 1)]
+
+    def in_rect(self, x, y, width, height):
+        """
+        Gets the chunks overlapping a rectangle of the world, such as the view.
+
+        Args:
+            x (float): World x-coordinate of the rectangle's left edge.
+            y (float): World y-coordinate of the rectangle's top edge.
+            width (float): Rectangle width in pixels.
+            height (float): Rectangle height in pixels.
+
+        Returns:
+            list: Chunks overlapping the rectangle.
+        """
+        first_cx, first_cy = self.chunk_at(x, y)
+        last_cx, last_cy = self.chunk_at(x + width - 1, y + height - 1)
+        return [self.get(cx, cy)
+                for cy in range(first_cy, last_cy + 1)
+                for cx in range(first_cx, last_cx + 1)]
+
+    def tile(self, row, col):
+        """
+        Gets the terrain kind of a tile by its world tile coordinates.
+
+        Args:
+            row (int): World tile row.
+            col (int): World tile column.
+
+        Returns:
+            int: Terrain kind of the tile.
+        """
+        chunk = self.get(col // self.size, row // self.size)
+        return chunk.terrain[row % self.size, col % self.size]
+
+    def collides_with_water(self, collision_box, max_allowed_collisions):
+        """
+        Checks whether a collision box overlaps too many water tiles.
+
+        Only the tiles under the box are looked up, generating their chunks if
+        needed.
+
+        Args:
+            collision_box (tuple): (x, y, width, height) box in world pixels.
+            max_allowed_collisions (int): Number of water tiles the box may
+                touch before counting as a collision.
+
+        Returns:
+            bool: True if more than max_allowed_collisions water tiles are touched.
+        """
+        box_x, box_y, box_w, box_h = (int(v) for v in collision_box)
+        if box_w <= 0 or box_h <= 0:
+            return False
+        tile_w, tile_h = TILE_SIZE
+        water_collision_count = 0
+        for row in range(box_y // tile_h, (box_y + box_h - 1) // tile_h + 1):
+            for col in range(box_x // tile_w, (box_x + box_w - 1) // tile_w + 1):
+                if self.tile(row, col) == WATER:
+                    water_collision_count += 1
+                    if water_collision_count > max_allowed_collisions:
+                        return True
+        return False
@@ -0,0 +1,292 @@
+"""
+Enemy storage for the Procedurally-Generated 2D Role-Playing Game.
+
+Keeps every enemy on the map in NumPy arrays so combat can be resolved for
+all of them at once, and in a spatial hash so range and overlap checks only
+look at the enemies nearby.
+"""
+import numpy as np
+
+from entities import in_reach
+from spatial import SpatialHash
+
+
+class EnemyStore:
+    """
+    Stores every enemy on the map as a structure of arrays.
+
+    Instead of one object per enemy, positions, health, alive flags and types
+    are kept in contiguous NumPy arrays so range checks and damage can be
+    applied to all enemies at once. Dead enemies stay in the store while their
+    death animation plays and are removed afterwards by compact().
+
+    Every enemy's id is also bucketed in a spatial hash by the cell of its
+    position. Positions must therefore be changed through move(), which
+    keeps the buckets up to date.
+
+    Attributes:
+        positions (numpy.ndarray): (N, 2) array of enemy x/y pixel positions
+        hp (numpy.ndarray): Current health points of each enemy
+        max_hp (numpy.ndarray): Starting health points of each enemy
+        alive (numpy.ndarray): Whether each enemy is still alive
+        types (numpy.ndarray): Sprite/type id of each enemy
+        ids (numpy.ndarray): Spawn order id of each enemy, kept across compaction
+        died_at (numpy.ndarray): Time each enemy died at, or -1 while alive
+        idle_ticks (numpy.ndarray): Ticks since each enemy was last updated
+        headings (numpy.ndarray): Direction each enemy wanders in, in radians
+        cells (numpy.ndarray): (N, 2) spatial hash cell of each enemy
+        grid (SpatialHash): Enemy ids bucketed by cell
+        rows_by_id (numpy.ndarray): Current index of each enemy id, or -1
+            for removed enemies
+    """
+    def __init__(self):
+        """
+        Initializes an empty enemy store.
+        """
+        self.positions = np.zeros((0, 2), dtype=np.float64)
+        self.hp = np.zeros(0, dtype=np.float64)
+        self.max_hp = np.zeros(0, dtype=np.float64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.types = np.zeros(0, dtype=np.uint8)
+        self.ids = np.zeros(0, dtype=np.int32)
+        self.died_at = np.zeros(0, dtype=np.int64)
+        self.idle_ticks = np.zeros(0, dtype=np.int32)
+        self.headings = np.zeros(0, dtype=np.float64)
+        self.cells = np.zeros((0, 2), dtype=np.int64)
+        self.grid = SpatialHash()
+        self.rows_by_id = np.zeros(0, dtype=np.intp)
+        self.next_id = 0
+
+    def __len__(self):
+        """
+        Gets the number of enemies in the store (alive or dying).
+
+        Returns:
+            int: Number of enemies.
+        """
+        return len(self.hp)
+
+    def spawn(self, positions, hp, type_id=0):
+        """
+        Adds a batch of enemies to the store.
+
+        Args:
+            positions (list): (x, y) pixel position of each new enemy.
+            hp (float): Starting health points of the new enemies.
+            type_id (int): Sprite/type id of the new enemies.
+        """
+        count = len(positions)
+        new_positions = np.asarray(positions, dtype=np.float64).reshape(count, 2)
+        self.positions = np.concatenate([self.positions, new_positions])
+        self.hp = np.concatenate([self.hp, np.full(count, hp, dtype=np.float64)])
+        self.max_hp = np.concatenate([self.max_hp, np.full(count, hp, dtype=np.float64)])
+        self.alive = np.concatenate([self.alive, np.ones(count, dtype=bool)])
+        self.types = np.concatenate([self.types, np.full(count, type_id, dtype=np.uint8)])
+        self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + count,
+                                                       dtype=np.int32)])
+        self.died_at = np.concatenate([self.died_at, np.full(count, -1, dtype=np.int64)])
+        self.idle_ticks = np.concatenate([self.idle_ticks, np.zeros(count, dtype=np.int32)])
+        self.headings = np.concatenate([self.headings, np.zeros(count, dtype=np.float64)])
+        cells = self.grid.cells(new_positions[:, 0], new_positions[:, 1])
+        self.cells = np.concatenate([self.cells, cells])
+        for enemy_id, cell in enumerate(map(tuple, cells.tolist()), self.next_id):
+            self.grid.add(enemy_id, cell)
+        self.rows_by_id = np.concatenate([self.rows_by_id,
+                                          np.arange(len(self) - count, len(self), dtype=np.intp)])
+        self.next_id += count
+
+    def adopt(self, other, rows):
+        """
+        Adds copies of some of another store's enemies, as they are.
+
+        The copies get new ids in this store; everything else (position,
+        health, type, time of death, idle ticks and heading) is kept. The
+        enemies stay in the other store until it drops them with select().
+
+        Args:
+            other (EnemyStore): Store to copy the enemies from.
+            rows (numpy.ndarray): Indices of the enemies in the other store.
+        """
+        start = len(self)
+        self.spawn(other.positions[rows], 0)
+        self.hp[start:] = other.hp[rows]
+        self.max_hp[start:] = other.max_hp[rows]
+        self.alive[start:] = other.alive[rows]
+        self.types[start:] = other.types[rows]
+        self.died_at[start:] = other.died_at[rows]
+        self.idle_ticks[start:] = other.idle_ticks[rows]
+        self.headings[start:] = other.headings[rows]
+
+    def move(self, rows, offsets):
+        """
+        Moves some of the enemies by an offset.
+
+        Args:
+            rows (numpy.ndarray): Indices of the enemies to move.
+            offsets (numpy.ndarray): (N, 2) distance to move each of them, in pixels.
+        """
+        self.place(rows, self.positions[rows] + offsets)
+
+    def place(self, rows, positions):
+        """
+        Puts some of the enemies at new positions, keeping the spatial hash
+        up to date.
+
+        Args:
+            rows (numpy.ndarray): Indices of the enemies to place.
+            positions (numpy.ndarray): (N, 2) new pixel position of each of them.
+        """
+        rows = np.asarray(rows)
+        self.positions[rows] = positions
+        cells = self.grid.cells(positions[:, 0], positions[:, 1])
+        old_cells = self.cells[rows]
+        # Only enemies that crossed into another cell change buckets
+        changed = np.flatnonzero((cells != old_cells).any(axis=1))
+        if len(changed):
+            for enemy_id, old_cell, cell in zip(self.ids[rows[changed]].tolist(),
+                                                old_cells[changed].tolist(),
+                                                cells[changed].tolist()):
+                self.grid.move(enemy_id, tuple(old_cell), tuple(cell))
+            self.cells[rows[changed]] = cells[changed]
+
+    def near(self, x, y, width, height):
+        """
+        Finds the enemies whose position may lie in a rectangle.
+
+        Only the spatial hash buckets overlapping the rectangle are looked
+        at, so the cost depends on how many enemies are nearby rather than
+        on how many are in the store.
+
+        Args:
+            x (float): Left edge of the rectangle.
+            y (float): Top edge of the rectangle.
+            width (float): Width of the rectangle.
+            height (float): Height of the rectangle.
+
+        Returns:
+            numpy.ndarray: Indices of the candidate enemies, in spawn order.
+        """
+        ids = self.grid.query(x, y, width, height)
+        rows = self.rows_by_id[np.fromiter(ids, np.intp, len(ids))]
+        rows.sort()
+        return rows
+
+    def touching(self, x, y, width, height, size):
+        """
+        Finds the living enemies whose sprite overlaps a rectangle.
+
+        Like pygame.Rect.colliderect(), rectangles that only touch along an
+        edge do not overlap.
+
+        Args:
+            x (float): Left edge of the rectangle.
+            y (float): Top edge of the rectangle.
+            width (float): Width of the rectangle.
+            height (float): Height of the rectangle.
+            size (tuple): Width and height of an enemy sprite.
+
+        Returns:
+            numpy.ndarray: Indices of the overlapping enemies, in spawn order.
+        """
+        rows = self.near(x - size[0], y - size[1], width + size[0], height + size[1])
+        enemy_x, enemy_y = self.positions[rows, 0], self.positions[rows, 1]
+        overlap = ((enemy_x < x + width) & (x < enemy_x + size[0]) &
+                   (enemy_y < y + height) & (y < enemy_y + size[1]))
+        return rows[overlap & self.alive[rows]]
+
+    def in_range(self, x, y, reach):
+        """
+        Finds the living enemies within a weapon's reach.
+
+        Only the enemies in the spatial hash buckets around the attacker are
+        checked.
+
+        Args:
+            x (float): Attacker's x-coordinate.
+            y (float): Attacker's y-coordinate.
+            reach (float): Weapon range in pixels.
+
+        Returns:
+            numpy.ndarray: Indices of the enemies that can be hit, in spawn order.
+        """
+        rows = self.near(x - reach, y - reach, 2 * reach, 2 * reach)
+        hit = self.alive[rows] & in_reach(x, y, reach, self.positions[rows, 0],
+                                          self.positions[rows, 1])
+        return rows[hit]
+
+    def apply_damage(self, mask, damage, now):
+        """
+        Damages every enemy selected by a mask and marks those that die.
+
+        An enemy dies once its health drops below zero.
+
+        Args:
+            mask (numpy.ndarray): Boolean mask of enemies to damage.
+            damage (float): Damage dealt to each selected enemy.
+            now (int): Current time, recorded as the time of death.
+        """
+        self.hp[mask] -= damage
+        died = mask & self.alive & (self.hp < 0)
+        self.alive[died] = False
+        self.died_at[died] = now
+
+    def attack(self, x, y, reach, damage, now):
+        """
+        Resolves one weapon swing against the enemies in the store.
+
+        Like the original per-enemy loop, a swing hits only the first enemy
+        (in spawn order) that is within reach.
+
+        Args:
+            x (float): Attacker's x-coordinate.
+            y (float): Attacker's y-coordinate.
+            reach (float): Weapon range in pixels.
+            damage (float): Damage dealt by the swing.
+            now (int): Current time, recorded if the enemy dies.
+
+        Returns:
+            int: Index of the enemy that was hit, or -1 if none was in range.
+        """
+        targets = self.in_range(x, y, reach)
+        if not len(targets):
+            return -1
+        index = int(targets[0])  # First enemy in range
+        hit = np.zeros(len(self), dtype=bool)
+        hit[index] = True
+        self.apply_damage(hit, damage, now)
+        return index
+
+    def compact(self, now, linger):
+        """
+        Removes enemies that have been dead for at least a given time.
+
+        Args:
+            now (int): Current time.
+            linger (int): How long a dead enemy stays (e.g. for its death
+                animation) before being removed.
+        """
+        keep = self.alive | (now - self.died_at < linger)
+        if not keep.all():
+            self.select(keep)
+
+    def select(self, keep):
+        """
+        Keeps only some of the enemies, in their current order.
+
+        Args:
+            keep (numpy.ndarray): Whether to keep each enemy.
+        """
+        for enemy_id, cell in zip(self.ids[~keep].tolist(), self.cells[~keep].tolist()):
+            self.grid.remove(enemy_id, tuple(cell))
+        self.cells = self.cells[keep]
+        self.rows_by_id[self.ids[~keep]] = -1
+        self.positions = self.positions[keep]
+        self.hp = self.hp[keep]
+        self.max_hp = self.max_hp[keep]
+        self.alive = self.alive[keep]
+        self.types = self.types[keep]
+        self.ids = self.ids[keep]
+        self.died_at = self.died_at[keep]
+        self.idle_ticks = self.idle_ticks[keep]
+        self.headings = self.headings[keep]
+        self.rows_by_id[self.ids] = np.arange(len(self.ids))
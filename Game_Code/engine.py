@@ -0,0 +1,722 @@
+"""
+Game engine for the Procedurally-Generated 2D Role-Playing Game.
+
+Runs the game rules (movement, weapon cooldowns, collision and combat) one
+tick at a time, without a window, keyboard or frame cap.
+"""
+import numpy as np
+
+from chunks import ChunkWorld
+from entities import Player
+from generation import ENEMY_HP, TILE_SIZE, WATER, generate_world, stream
+from pathfinding import FlowField
+from scheduler import UpdateScheduler
+from rooms import RoomGraph
+from weapons import make_weapons
+
+CHARACTER_SIZE = (60, 80)  # Size of the player sprite
+OBJECT_SIZE = (50, 50)  # Size of treasure chest sprites
+ENEMY_SIZE = (60, 60)  # Size of enemy sprites
+ENEMY_SPEED = 2  # Pixels an enemy moves per tick
+CHASE_DISTANCE = 10  # Tiles from the player within which enemies give chase
+WANDER_SPEED = 1  # Pixels a wandering enemy moves per tick
+WANDER_TURN = 0.3  # Spread of a wandering enemy's change of heading per update, in radians
+PLAYER_SPEED = 5  # Pixels moved per tick
+TICK_RATE = 60  # Simulation ticks per second of game time
+MAX_STEPS_PER_FRAME = 5  # Ticks simulated per frame before falling behind is dropped
+MAX_ALLOWED_WATER_COLLISIONS = 2  # Water tiles the player may touch before being blocked
+DEATH_LINGER_TICKS = 60  # How long a defeated enemy's death animation plays
+EXIT_HALF_WIDTH = 60  # How far from the middle of an edge its room exit reaches
+PREFETCH_DISTANCE = 200  # How close to an exit the next room starts generating
+
+
+def rects_overlap(a, b):
+    """
+    Checks whether two rectangles overlap, matching pygame.Rect.colliderect().
+
+    Rectangles are (x, y, width, height) tuples. Like pygame.Rect, coordinates
+    and sizes are truncated to whole pixels, rectangles that only touch along
+    an edge do not overlap, and empty rectangles never overlap anything.
+
+    Args:
+        a (tuple): First rectangle.
+        b (tuple): Second rectangle.
+
+    Returns:
+        bool: True if the rectangles overlap.
+    """
+    ax, ay, aw, ah = (int(v) for v in a)
+    bx, by, bw, bh = (int(v) for v in b)
+    if aw <= 0 or ah <= 0 or bw <= 0 or bh <= 0:
+        return False
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+def collides_with_water(terrain_grid, collision_box, scaled_tile_size,
+                        max_allowed_collisions):
+    """
+    Checks whether a collision box overlaps too many water tiles.
+
+    Only the tiles under the collision box are inspected: the box is converted
+    into the range of row and column indices it can touch, so the cost depends
+    on the size of the box rather than the size of the map.
+
+    Args:
+        terrain_grid (numpy.ndarray): Grid of terrain kinds.
+        collision_box (tuple): (x, y, width, height) box to test, in screen
+            coordinates.
+        scaled_tile_size (tuple): Width and height of a tile on screen.
+        max_allowed_collisions (int): Number of water tiles the box may touch
+            before counting as a collision.
+
+    Returns:
+        bool: True if more than max_allowed_collisions water tiles are touched.
+    """
+    tile_w, tile_h = scaled_tile_size
+    rows, cols = terrain_grid.shape
+    box_x, box_y, box_w, box_h = collision_box
+
+    # Widen the index range by one tile on each side, since tile rects are
+    # truncated to whole pixels and may not line up exactly with the division
+    first_col = max(0, int(box_x // tile_w) - 1)
+    last_col = min(cols - 1, int((box_x + box_w) // tile_w) + 1)
+    first_row = max(0, int(box_y // tile_h) - 1)
+    last_row = min(rows - 1, int((box_y + box_h) // tile_h) + 1)
+
+    # Only check collision for water tiles, not outline markers
+    nearby = terrain_grid[first_row:last_row + 1, first_col:last_col + 1] == WATER
+    water_collision_count = 0
+    for i, j in zip(*np.nonzero(nearby)):
+        i += first_row
+        j += first_col
+        water_rect = (j * tile_w, i * tile_h, tile_w, tile_h)
+        if rects_overlap(collision_box, water_rect):
+            water_collision_count += 1
+            # Allow player to touch edges of water (max_allowed_collisions)
+            if water_collision_count > max_allowed_collisions:
+                return True
+    return False
+
+
+class Inputs:
+    """
+    The player's input for one simulation step.
+
+    Attributes:
+        left (bool): Move left
+        right (bool): Move right
+        up (bool): Move up
+        down (bool): Move down
+        attack (bool): Swing the equipped weapon
+        weapon (int): Inventory slot to equip, or None to keep the current weapon
+    """
+    def __init__(self, left=False, right=False, up=False, down=False,
+                 attack=False, weapon=None):
+        """
+        Initializes the input state.
+
+        Args:
+            left (bool): Move left.
+            right (bool): Move right.
+            up (bool): Move up.
+            down (bool): Move down.
+            attack (bool): Swing the equipped weapon.
+            weapon (int): Inventory slot to equip, or None.
+        """
+        self.left = left
+        self.right = right
+        self.up = up
+        self.down = down
+        self.attack = attack
+        self.weapon = weapon
+
+
+class FixedTimestep:
+    """
+    Turns elapsed real time into a number of fixed-length simulation ticks.
+
+    Movement and cooldowns are counted in ticks, so running a fixed number of
+    ticks per second of real time keeps the game speed independent of the
+    frame rate: a slow frame is followed by several ticks, a fast one by none.
+    Time left over from one frame carries into the next. After a long stall,
+    at most max_steps ticks are run and the rest of the backlog is dropped,
+    so the game does not spiral into ever longer catch-up frames.
+
+    Attributes:
+        tick_seconds (float): Length of one tick in seconds
+        max_steps (int): Most ticks run for a single frame at normal speed
+            (fast-forwarding raises the limit by the speed factor)
+        speed (float): Game time per second of real time (above 1 fast-forwards)
+        accumulator (float): Game time not yet simulated, in seconds
+        dropped (int): Ticks skipped so far because of the max_steps limit
+    """
+    def __init__(self, tick_rate=TICK_RATE, max_steps=MAX_STEPS_PER_FRAME, speed=1.0):
+        """
+        Initializes the timestep with no time accumulated.
+
+        Args:
+            tick_rate (int): Simulation ticks per second of game time.
+            max_steps (int): Most ticks to run for a single frame.
+            speed (float): Game time per second of real time.
+        """
+        self.tick_seconds = 1 / tick_rate
+        self.max_steps = max_steps
+        self.speed = speed
+        self.accumulator = 0.0
+        self.dropped = 0
+
+    def advance(self, elapsed):
+        """
+        Adds elapsed real time and gets the number of ticks to simulate.
+
+        Args:
+            elapsed (float): Real time since the previous call, in seconds.
+
+        Returns:
+            int: Number of ticks to run this frame.
+        """
+        self.accumulator += elapsed * self.speed
+        steps = int(self.accumulator / self.tick_seconds)
+        limit = max(self.max_steps, int(self.max_steps * self.speed))
+        if steps > limit:
+            # Too far behind: drop the backlog instead of slowing down further
+            self.dropped += steps - limit
+            steps = limit
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.tick_seconds
+        return steps
+
+
+class GameState:
+    """
+    The complete state of a game, advanced one tick at a time by step().
+
+    GameState runs the game rules (movement, weapon cooldowns, water and
+    object collision, attacks) without any window, keyboard or frame cap, so it
+    can be driven by the interactive game loop as well as by tests, balancing
+    scripts or bots that simulate thousands of ticks per second.
+
+    The game is played on a single screen-sized map, on a graph of such maps
+    (rooms) connected through exits in the middle of each screen edge, or, in
+    infinite mode, on an endless ChunkWorld generated around the player.
+
+    Attributes:
+        seed (int): Seed of the current map
+        world (World): Current map (the current room's map in room mode), or
+            None in infinite mode
+        rooms (RoomGraph): Rooms of the world, or None when not in room mode
+        chunks (ChunkWorld): Infinite world, or None when not in infinite mode
+        player (Player): The player, holding position, HP and weapons
+        view_size (tuple): Width and height of the view the player is kept in
+        cooldown (bool): Whether the equipped weapon can be swung
+        timer (int): Ticks left before the weapon can be swung again
+        forward (bool): Whether the player is facing right
+        tick (int): Number of steps simulated so far
+        profiler (FrameProfiler): Profiler charged with the time of each phase
+            of step(), or None to skip timing
+        flow (FlowField): Distances toward the player's tile, shared by every
+            enemy
+        flow_source (object): Terrain grid (or center chunk in infinite mode)
+            the flow field was built from
+        flow_tile_size (tuple): Tile size the flow field was built with
+        scheduler (UpdateScheduler): Picks which enemies are updated each tick
+        wander_rng (numpy.random.Generator): Random numbers for wandering
+            enemies, or None when enemies that are not chasing stand still
+        horde (int): Size of the horde added to each room entered, or None
+        horde_maps (set): Maps a horde has been added to
+    """
+    def __init__(self, seed, view_size=(1000, 700), infinite=False, rooms=False):
+        """
+        Creates a new game with a freshly generated map.
+
+        Args:
+            seed (int): Random seed for the first map.
+            view_size (tuple): Width and height of the view, in pixels.
+            infinite (bool): Play on an endless chunked world instead of a
+                single map. The player is then not kept inside the view.
+            rooms (bool): Connect maps into a room graph through exits in the
+                middle of each screen edge.
+
+        Raises:
+            ValueError: If both infinite and rooms are requested
+        """
+        if infinite and rooms:
+            raise ValueError("infinite and room modes cannot be combined")
+        self.seed = seed
+        self.chunks = ChunkWorld(seed) if infinite else None
+        self.rooms = RoomGraph(seed) if rooms else None
+        if infinite:
+            self.world = None
+        elif rooms:
+            self.world = self.rooms.current.world
+        else:
+            self.world = generate_world(seed)
+        self.player = Player(100, 0, 0)
+        for weapon in make_weapons():
+            self.player.add_inventory(weapon)
+        # Setting the default weapon to the first item (in this case the sword)
+        self.player.set_tool(0)
+        self.view_size = view_size
+
+        # Initialize combat system variables
+        self.cooldown = True  # Track if weapon can be used
+        self.timer = 0  # Countdown between attacks
+        self.forward = True  # Track player facing direction
+        self.tick = 0
+        self.profiler = None
+        self.flow = FlowField(CHASE_DISTANCE)
+        self.flow_source = None
+        self.flow_tile_size = None
+        self.scheduler = UpdateScheduler()
+        self.wander_rng = None
+        self.horde = None
+        self.horde_maps = set()
+
+    def regenerate(self, seed):
+        """
+        Replaces the current map with a new one (as when Enter is pressed).
+
+        Args:
+            seed (int): Random seed for the new map.
+        """
+        if self.chunks is not None:
+            self.seed = seed
+            self.chunks = ChunkWorld(seed, self.chunks.size, self.chunks.max_chunks)
+        else:
+            self.set_world(generate_world(seed, lakes=True))
+
+    def set_world(self, world):
+        """
+        Swaps in an already generated map.
+
+        In room mode the map becomes room (0, 0) of a new room graph.
+
+        Args:
+            world (World): The new map.
+        """
+        self.seed = world.seed
+        if self.rooms is not None:
+            self.rooms.close()
+            self.rooms = RoomGraph(world.seed, origin=world)
+            world = self.rooms.current.world
+        self.world = world
+
+    def close(self):
+        """
+        Stops any background room generation.
+        """
+        if self.rooms is not None:
+            self.rooms.close()
+
+    def exit_direction(self, inputs):
+        """
+        Gets the room exit the player is walking through, if any.
+
+        An exit is the middle part of a screen edge. The player walks through
+        it by pushing against that edge.
+
+        Args:
+            inputs (Inputs): Player input for this tick.
+
+        Returns:
+            str: Exit direction ("w", "n", "s" or "e"), or None.
+        """
+        view_w, view_h = self.view_size
+        x, y = self.player.x, self.player.y
+        at_middle_x = abs(x + CHARACTER_SIZE[0] / 2 - view_w / 2) <= EXIT_HALF_WIDTH
+        at_middle_y = abs(y + CHARACTER_SIZE[1] / 2 - view_h / 2) <= EXIT_HALF_WIDTH
+        if inputs.left and x <= 0 and at_middle_y:
+            return "w"
+        if inputs.right and x >= view_w - CHARACTER_SIZE[0] and at_middle_y:
+            return "e"
+        if inputs.up and y <= 0 and at_middle_x:
+            return "n"
+        if inputs.down and y >= view_h - CHARACTER_SIZE[1] and at_middle_x:
+            return "s"
+        return None
+
+    def nearby_exits(self):
+        """
+        Gets the room exits close to the player.
+
+        Returns:
+            list: Directions of the exits within PREFETCH_DISTANCE of the
+            player's center.
+        """
+        view_w, view_h = self.view_size
+        center_x = self.player.x + CHARACTER_SIZE[0] / 2
+        center_y = self.player.y + CHARACTER_SIZE[1] / 2
+        exits = {
+            "w": (0, view_h / 2),
+            "n": (view_w / 2, 0),
+            "s": (view_w / 2, view_h),
+            "e": (view_w, view_h / 2),
+        }
+        return [direction for direction, (exit_x, exit_y) in exits.items()
+                if (center_x - exit_x) ** 2 + (center_y - exit_y) ** 2
+                <= PREFETCH_DISTANCE ** 2]
+
+    def enter_room(self, direction):
+        """
+        Moves the player into the neighbouring room.
+
+        The player arrives at the opposite edge of the new room. In stress
+        mode, a room entered for the first time gets its own horde.
+
+        Args:
+            direction (str): Exit direction ("w", "n", "s" or "e").
+        """
+        self.world = self.rooms.move(direction).world
+        view_w, view_h = self.view_size
+        if direction == "w":
+            self.player.x = view_w - CHARACTER_SIZE[0]
+        elif direction == "e":
+            self.player.x = 0
+        elif direction == "n":
+            self.player.y = view_h - CHARACTER_SIZE[1]
+        else:
+            self.player.y = 0
+        if self.horde is not None and self.world not in self.horde_maps:
+            self.spawn_horde(self.horde)
+
+    def areas(self):
+        """
+        Gets the maps whose objects and enemies the player can interact with.
+
+        Returns:
+            list: The current World, or in infinite mode the chunks around
+            the player.
+        """
+        if self.chunks is None:
+            return [self.world]
+        return self.chunks.around(self.player.x, self.player.y)
+
+    def update_flow(self, center_x, center_y):
+        """
+        Points the flow field at the player's tile.
+
+        The walkable grid is rebuilt only when the map changes (or, in
+        infinite mode, when the player enters another chunk), and the
+        distances only when the player enters another tile.
+
+        Args:
+            center_x (float): x-coordinate of the player's center.
+            center_y (float): y-coordinate of the player's center.
+
+        Returns:
+            tuple: Width and height of the tiles the field is laid out in.
+        """
+        if self.chunks is None:
+            # Same screen-scaled tiles as the player's water collision
+            terrain = self.world.terrain
+            rows, cols = terrain.shape
+            tile_size = (self.view_size[0] / cols, self.view_size[1] / rows)
+            if terrain is not self.flow_source or tile_size != self.flow_tile_size:
+                self.flow.set_grid(terrain != WATER)
+                self.flow_source, self.flow_tile_size = terrain, tile_size
+        else:
+            # The 3x3 chunks around the player, joined into one grid
+            tile_size = TILE_SIZE
+            nearby = self.chunks.around(center_x, center_y)
+            center = nearby[4]
+            if center is not self.flow_source:
+                terrain = np.block([[chunk.terrain for chunk in nearby[i:i + 3]]
+                                    for i in (0, 3, 6)])
+                size = self.chunks.size
+                self.flow.set_grid(terrain != WATER,
+                                   ((center.cy - 1) * size, (center.cx - 1) * size))
+                self.flow_source, self.flow_tile_size = center, tile_size
+        self.flow.set_target(int(center_y // tile_size[1]), int(center_x // tile_size[0]))
+        return tile_size
+
+    def move_enemies(self, areas):
+        """
+        Moves the living enemies toward the player.
+
+        Each enemy heads for the center of the neighbouring tile that the
+        shared flow field says is closest to the player, so enemies walk
+        around water. Enemies further than CHASE_DISTANCE tiles away, or with
+        no path to the player, stay where they are, or wander once a horde
+        has been spawned. The update scheduler decides which enemies move
+        this tick; an enemy that skipped ticks moves as far as it would have
+        in all of them. In infinite mode, an enemy that walks into another
+        chunk is then handed over to that chunk.
+
+        Args:
+            areas (list): Maps whose enemies to move.
+        """
+        areas = [area for area in areas if area.enemies.alive.any()]
+        if not areas:
+            return
+        player = self.player
+        center_x = player.x + CHARACTER_SIZE[0] / 2
+        center_y = player.y + CHARACTER_SIZE[1] / 2
+        tile_w, tile_h = self.update_flow(center_x, center_y)
+
+        # The part of the world on screen (the view follows the player in infinite mode)
+        view_w, view_h = self.view_size
+        if self.chunks is None:
+            view_rect = (0, 0, view_w, view_h)
+        else:
+            view_rect = (player.x + CHARACTER_SIZE[0] // 2 - view_w // 2,
+                         player.y + CHARACTER_SIZE[1] // 2 - view_h // 2, view_w, view_h)
+
+        batches = []
+        groups = []
+        for area in areas:
+            enemies = area.enemies
+            walkers = np.flatnonzero(enemies.alive)
+            enemies.idle_ticks[walkers] += 1  # One more tick to catch up on
+            centers = enemies.positions[walkers] + np.array(ENEMY_SIZE) / 2
+            levels = self.scheduler.levels(centers, (center_x, center_y), view_rect)
+            batches.append((area, walkers, centers))
+            groups.append((enemies.ids[walkers], levels, enemies.idle_ticks[walkers]))
+
+        moved = []
+        for (area, walkers, centers), chosen in zip(batches, self.scheduler.plan(self.tick, groups)):
+            if not len(chosen):
+                continue
+            enemies = area.enemies
+            walkers, centers = walkers[chosen], centers[chosen]
+            moved.append((area, walkers))
+            elapsed = enemies.idle_ticks[walkers]
+            enemies.idle_ticks[walkers] = 0
+            rows = (centers[:, 1] // tile_h).astype(np.int64)
+            cols = (centers[:, 0] // tile_w).astype(np.int64)
+            next_rows, next_cols, moving = self.flow.steer(rows, cols)
+            if self.wander_rng is not None and not moving.all():
+                idle = ~moving
+                self.wander(enemies, walkers[idle], centers[idle], elapsed[idle], (tile_w, tile_h))
+            if not moving.any():
+                continue
+
+            # Step toward the center of the next tile, without overshooting it
+            targets = np.column_stack(((next_cols + 0.5) * tile_w, (next_rows + 0.5) * tile_h))
+            offsets = (targets - centers)[moving]
+            lengths = np.hypot(offsets[:, 0], offsets[:, 1])
+            scale = np.minimum(ENEMY_SPEED * elapsed[moving], lengths) / np.maximum(lengths, 1e-9)
+            enemies.move(walkers[moving], offsets * scale[:, None])
+
+        if self.chunks is not None:
+            self.rehome_enemies(moved)
+
+    def rehome_enemies(self, moved):
+        """
+        Hands enemies that walked out of their chunk over to the chunk they
+        now stand in.
+
+        An enemy belongs to the chunk its position (the top-left corner of
+        its sprite) lies in, so it is drawn, updated and hit with that chunk,
+        and kept in memory as long as that chunk is.
+
+        Args:
+            moved (list): (chunk, rows) pairs of the enemies that may have moved.
+        """
+        chunk_px = self.chunks.size * np.array(TILE_SIZE)
+        for chunk, rows in moved:
+            enemies = chunk.enemies
+            homes = np.floor_divide(enemies.positions[rows], chunk_px).astype(np.int64)
+            away = (homes != (chunk.cx, chunk.cy)).any(axis=1)
+            if not away.any():
+                continue
+            rows, homes = rows[away], homes[away]
+            for cx, cy in np.unique(homes, axis=0).tolist():
+                self.chunks.get(cx, cy).enemies.adopt(enemies, rows[(homes == (cx, cy)).all(axis=1)])
+            keep = np.ones(len(enemies), dtype=bool)
+            keep[rows] = False
+            enemies.select(keep)
+
+    def wander(self, enemies, walkers, centers, elapsed, tile_size):
+        """
+        Moves enemies that are not chasing the player along a random walk.
+
+        Each enemy's heading drifts a little on every update. An enemy whose
+        next step would end on water, or outside the flow field's grid,
+        turns around instead of moving.
+
+        Args:
+            enemies (EnemyStore): Store the enemies belong to.
+            walkers (numpy.ndarray): Indices of the enemies to move.
+            centers (numpy.ndarray): (N, 2) center position of each of them.
+            elapsed (numpy.ndarray): Ticks each of them has to catch up on.
+            tile_size (tuple): Width and height of the flow field's tiles.
+        """
+        headings = enemies.headings[walkers] + self.wander_rng.normal(0, WANDER_TURN, len(walkers))
+        offsets = np.column_stack((np.cos(headings), np.sin(headings))) * (WANDER_SPEED * elapsed)[:, None]
+        targets = centers + offsets
+        rows = (targets[:, 1] // tile_size[1]).astype(np.int64) - self.flow.origin[0]
+        cols = (targets[:, 0] // tile_size[0]).astype(np.int64) - self.flow.origin[1]
+        grid_rows, grid_cols = self.flow.walkable.shape
+        inside = (rows >= 0) & (rows < grid_rows) & (cols >= 0) & (cols < grid_cols)
+        free = np.zeros(len(walkers), dtype=bool)
+        free[inside] = self.flow.walkable[rows[inside], cols[inside]]
+        headings[~free] += np.pi  # Turn around at water and at the edge of the grid
+        enemies.headings[walkers] = headings
+        enemies.move(walkers[free], offsets[free])
+
+    def spawn_horde(self, count):
+        """
+        Adds a horde of wandering enemies around the player, for stress testing.
+
+        The enemies are spread over the walkable tiles of the flow field's
+        grid: the whole map, or in infinite mode the 3x3 chunks around the
+        player, each enemy joining the chunk its position lies in. From then on,
+        enemies that are not chasing the player wander, and in room mode each
+        room entered for the first time gets a horde of the same size.
+
+        Args:
+            count (int): Number of enemies to add.
+        """
+        player = self.player
+        tile_w, tile_h = self.update_flow(player.x + CHARACTER_SIZE[0] / 2,
+                                          player.y + CHARACTER_SIZE[1] / 2)
+        self.horde = count
+        self.horde_maps.add(self.world)
+        # Each room draws its own horde from its map's seed
+        seed = self.seed if self.world is None else self.world.seed
+        rng = np.random.default_rng(stream(seed, "horde").getrandbits(64))
+        self.wander_rng = np.random.default_rng(stream(self.seed, "wander").getrandbits(64))
+
+        # Random walkable tiles, and a random point within each
+        rows, cols = np.nonzero(self.flow.walkable)
+        picks = rng.integers(len(rows), size=count)
+        centers = np.column_stack(((cols[picks] + self.flow.origin[1] + rng.random(count)) * tile_w,
+                                   (rows[picks] + self.flow.origin[0] + rng.random(count)) * tile_h))
+        positions = centers - np.array(ENEMY_SIZE) / 2
+        headings = rng.uniform(0, 2 * np.pi, count)
+        types = rng.integers(2, size=count)
+
+        if self.chunks is None:
+            areas = np.zeros(count, dtype=np.int64)
+            stores = [self.world.enemies]
+        else:
+            chunk_px = self.chunks.size * np.array(TILE_SIZE)
+            keys = np.floor_divide(positions, chunk_px).astype(np.int64)
+            unique, areas = np.unique(keys, axis=0, return_inverse=True)
+            areas = areas.ravel()
+            stores = [self.chunks.get(cx, cy).enemies for cx, cy in unique.tolist()]
+        for area, enemies in enumerate(stores):
+            for type_id in (0, 1):
+                mine = np.flatnonzero((areas == area) & (types == type_id))
+                enemies.spawn(positions[mine], ENEMY_HP, type_id)
+                enemies.headings[len(enemies) - len(mine):] = headings[mine]
+
+    def step(self, inputs):
+        """
+        Advances the game by one tick.
+
+        Args:
+            inputs (Inputs): Player input for this tick.
+        """
+        player = self.player
+        profiler = self.profiler
+        areas = self.areas()
+        x, y = player.x, player.y
+
+        # Get the attack range of currently equipped weapon
+        reach = player.get_range()
+
+        # Store potential new position, will be validated before applying
+        new_x, new_y = x, y
+
+        # Handle movement inputs
+        if inputs.left:
+            new_x -= PLAYER_SPEED  # Move left
+            self.forward = False  # Face left
+        if inputs.right:
+            new_x += PLAYER_SPEED  # Move right
+            self.forward = True  # Face right
+        if inputs.up:
+            new_y -= PLAYER_SPEED  # Move up
+        if inputs.down:
+            new_y += PLAYER_SPEED  # Move down
+
+        # Handle attack inputs
+        if inputs.attack and self.cooldown:
+            # Hit the first living enemy in weapon range, if any
+            for area in areas:
+                if area.enemies.attack(x, y, reach, player.get_damage(), self.tick) >= 0:
+                    self.cooldown = False  # Start weapon cooldown
+                    self.timer = player.get_cooldown()  # Set cooldown duration
+                    break
+        if profiler is not None:
+            profiler.lap("attack")
+
+        # Handle weapon cooldown timer
+        if not self.cooldown:
+            self.timer -= 1  # Decrement the cooldown timer each tick
+            if self.timer <= 0:
+                self.cooldown = True  # Reset cooldown when timer expires
+
+        # Weapon selection, ignoring slots that are not in the inventory
+        if inputs.weapon is not None and inputs.weapon < player.get_inventory_size():
+            player.set_tool(inputs.weapon)
+        if profiler is not None:
+            profiler.lap("cooldown")
+
+        # Check for out-of-bounds movement (the infinite world has no bounds)
+        view_w, view_h = self.view_size
+        if self.chunks is None:
+            new_x = max(0, min(new_x, view_w - CHARACTER_SIZE[0]))
+            new_y = max(0, min(new_y, view_h - CHARACTER_SIZE[1]))
+
+        # Create a slightly smaller collision box for the character
+        character_collision_box = (
+            new_x + 15,  # Increased offset from left edge
+            new_y + 60,  # Increased offset from top edge
+            CHARACTER_SIZE[0] - 30,  # Further reduce width
+            CHARACTER_SIZE[1] - 70  # Further reduce height
+        )
+
+        if self.chunks is None:
+            # Water collision uses tiles scaled to the view size
+            rows, cols = self.world.terrain.shape
+            scaled_tile_size = (view_w / cols, view_h / rows)
+            collision_with_water = collides_with_water(self.world.terrain,
+                                                       character_collision_box,
+                                                       scaled_tile_size,
+                                                       MAX_ALLOWED_WATER_COLLISIONS)
+        else:
+            collision_with_water = self.chunks.collides_with_water(character_collision_box,
+                                                                   MAX_ALLOWED_WATER_COLLISIONS)
+
+        # Update character position only if no water collision
+        if not collision_with_water:
+            player.x, player.y = new_x, new_y
+
+        if self.rooms is not None:
+            # Generate the rooms behind nearby exits before they are reached
+            for direction in self.nearby_exits():
+                self.rooms.prefetch(direction)
+
+            # Walk through an exit into the neighbouring room
+            direction = self.exit_direction(inputs)
+            if direction is not None:
+                self.enter_room(direction)
+                areas = self.areas()
+        if profiler is not None:
+            profiler.lap("collision")
+
+        # Enemies chase the player along the shared flow field
+        self.move_enemies(areas)
+        if profiler is not None:
+            profiler.lap("enemies")
+
+        # Check for collision with objects that have not been opened yet,
+        # looking only at the objects bucketed near the player
+        character_rect = (player.x, player.y) + CHARACTER_SIZE
+        for area in areas:
+            for i in area.object_grid.query(player.x - OBJECT_SIZE[0], player.y - OBJECT_SIZE[1],
+                                            CHARACTER_SIZE[0] + OBJECT_SIZE[0],
+                                            CHARACTER_SIZE[1] + OBJECT_SIZE[1]):
+                if not area.object_collided[i]:
+                    if rects_overlap(character_rect, area.object_positions[i] + OBJECT_SIZE):
+                        area.object_collided[i] = True  # Mark object as collided
+
+            # Remove enemies whose death animation has finished
+            area.enemies.compact(self.tick, DEATH_LINGER_TICKS)
+        if profiler is not None:
+            profiler.lap("objects")
+
+        self.tick += 1
@@ -0,0 +1,191 @@
+"""
+Entities of the Procedurally-Generated 2D Role-Playing Game.
+
+Defines the player character and enemies, along with the attack range rule
+shared by single enemies and the enemy store.
+"""
+
+
+class Player:
+    """
+    A class representing the player character in the game.
+
+    The player is the main controllable character that can move around the world,
+    equip weapons, manage inventory, and interact with enemies.
+
+    Attributes:
+        inventory (list): List of weapons the player can carry
+        HP (int): Player's current health points
+        tool (Weapon): Currently equipped weapon
+        damage (int): Current attack damage value
+        range (int): Current attack range
+        x (int): Player's x coordinate position
+        y (int): Player's y coordinate position
+    """
+    def __init__(self, HP, x, y):
+        """
+        Initializes player attributes and inventory system.
+
+        The player starts with empty inventory and no equipped weapon. Initial position 
+        and health points are set based on input parameters.
+
+        Args:
+            HP (int): Player's starting health points/hit points
+            x (int): Player's initial x-coordinate position on the game map
+            y (int): Player's initial y-coordinate position on the game map
+
+        Returns:
+            None
+
+        Example:
+            player = Player(100, 50, 50)  # Creates player with 100 HP at position (50,50)
+        """
+        self.inventory = []
+        self.HP = HP
+        self.tool = None
+        self.damage = 0
+        self.range = 0
+        self.x = x
+        self.y = y
+
+    def get_inventory(self):
+        """
+        Gets the player's inventory.
+
+        Returns:
+            list: Player's inventory.
+        """
+        return self.inventory
+    
+    def add_inventory(self, item):
+        """
+        Adds a weapon to the player's inventory.
+
+        Args:
+            item (Weapon): Weapon to add.
+        """
+        self.inventory.append(item)
+    
+    def set_tool(self, num):
+        """
+        Equips a weapon from inventory.
+
+        Args:
+            num (int): Index of the weapon.
+        """
+        self.tool = self.inventory[num]
+        self.set_damage()
+    
+    def get_tool(self):
+        """
+        Gets the equipped weapon.
+
+        Returns:
+            Weapon: Equipped weapon.
+        """
+        return self.tool
+    
+    def get_inventory_size(self):
+        """
+        Gets the number of items in inventory.
+
+        Returns:
+            int: Inventory size.
+        """
+        return len(self.inventory)
+    
+    def set_damage(self):
+        """
+        Sets the player's damage based on equipped weapon.
+        """
+        if self.tool:
+            self.damage = self.tool.get_damage()
+    
+    def get_damage(self):
+        """
+        Gets the player's damage value.
+
+        Returns:
+            int: Damage stat.
+        """
+        return self.damage
+    
+    def get_cooldown(self):
+        """
+        Gets the cooldown time of the equipped weapon.
+
+        Returns:
+            int: Cooldown duration.
+        """
+        return self.tool.get_cooldown()
+    
+    def get_range(self):
+        """
+        Gets the attack range of the equipped weapon.
+
+        Returns:
+            int: Weapon range.
+        """
+        return self.tool.get_range()
+
+    def attack(self, enemy):
+        """
+        Attacks an enemy with the equipped weapon if it is within range.
+
+        Args:
+            enemy (Enemy): Enemy to attack. Its HP is reduced by the player's
+                damage when it is within the weapon's range.
+
+        Returns:
+            bool: True if the enemy was hit.
+        """
+        if in_reach(self.x, self.y, self.get_range(), enemy.x, enemy.y):
+            enemy.HP -= self.damage
+            return True
+        return False
+
+
+class Enemy:
+    """
+    Represents an enemy character in the game world.
+
+    The Enemy class defines attributes and behaviors for hostile entities that can
+    interact with the player. Enemies have health points and position coordinates.
+
+    Attributes:
+        HP (int): Current health points of the enemy
+        x (int): X-coordinate position on the game map
+        y (int): Y-coordinate position on the game map
+    """
+    def __init__(self, HP, x, y):
+        """
+        Initializes enemy attributes.
+
+        Args:
+            HP (int): Enemy's health points.
+            x (int): Enemy's horizontal position.
+            y (int): Enemy's vertical position.
+        """
+        self.HP = HP
+        self.x = x
+        self.y = y
+
+
+def in_reach(x, y, reach, target_x, target_y):
+    """
+    Checks whether a target lies inside the square attack area around a point.
+
+    Works on plain numbers as well as on NumPy arrays of target coordinates.
+
+    Args:
+        x (float): Attacker's x-coordinate.
+        y (float): Attacker's y-coordinate.
+        reach (float): Weapon range in pixels.
+        target_x (float or numpy.ndarray): Target x-coordinate(s).
+        target_y (float or numpy.ndarray): Target y-coordinate(s).
+
+    Returns:
+        bool or numpy.ndarray: Whether each target is within reach.
+    """
+    return ((x - reach < target_x) & (target_x < x + reach) &
+            (y - reach < target_y) & (target_y < y + reach))
@@ -0,0 +1,385 @@
+"""
+Procedural map generation for the Procedurally-Generated 2D Role-Playing Game.
+
+Terrain is stored as a grid of tile kinds (one byte per tile). Water bodies,
+their outlines, objects and enemies are all generated from a seed, so the
+same seed always produces the same map. Each generation stage draws from its
+own random stream derived from the seed. Objects and enemies are only placed
+on free walkable tiles, picked from an index of the tiles left free.
+"""
+import hashlib
+import random
+import time
+
+import numpy as np
+
+from enemies import EnemyStore
+from spatial import SpatialHash
+
+# Terrain tile kinds stored in the terrain grid (one byte per tile)
+GRASS = 0
+WATER = 1
+OUTLINE = 2  # Grass tile bordering water, drawn with the water outline image
+
+MAP_ROWS = 20  # Terrain grid height in tiles
+MAP_COLS = 25  # Terrain grid width in tiles
+TILE_SIZE = (32, 32)  # Tile size for terrain rendering and object placement
+ENEMY_HP = 10  # Starting health points of each enemy
+
+
+def make_seed():
+    """
+    Generates a short random seed based on the current time.
+
+    Returns:
+        int: The last 5 digits of the current time, for a more readable seed.
+    """
+    return int(str(int(time.time() * 10000))[-5:])
+
+
+def stream(seed, *key):
+    """
+    Derives an independent random number generator for one part of a map.
+
+    The generator is seeded from a hash of the world seed and a key naming the
+    generation stage (and optionally a region, such as chunk coordinates), so
+    every stage and region gets its own reproducible stream. Stages can then
+    be generated in any order, or concurrently, and still produce the same map.
+
+    Args:
+        seed (int): World seed.
+        *key: Stage name followed by any region identifiers.
+
+    Returns:
+        random.Random: Generator for that stage and region.
+
+    Example:
+        rng = stream(42, "enemies")  # Same numbers every time for seed 42
+    """
+    digest = hashlib.blake2b(repr((seed,) + key).encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, "little"))
+
+
+def new_terrain(rows, cols):
+    """
+    Creates a terrain grid filled with grass.
+
+    Args:
+        rows (int): Number of tile rows.
+        cols (int): Number of tile columns.
+
+    Returns:
+        numpy.ndarray: Grid of terrain kinds with shape (rows, cols).
+    """
+    return np.full((rows, cols), GRASS, dtype=np.uint8)
+
+
+def stamp_clusters(terrain_grid, rng):
+    """
+    Stamps square clusters of water onto the terrain grid.
+
+    Args:
+        terrain_grid (numpy.ndarray): Grid of terrain kinds, modified in place.
+        rng (random.Random): Random number generator to draw from.
+    """
+    rows, cols = terrain_grid.shape
+    num_clusters = rng.randint(3, 5)  # Random number of clusters
+    for _ in range(num_clusters):
+        cluster_size = rng.randint(2, 7)  # Random size for each cluster
+        cluster_x = rng.randint(0, cols - cluster_size)
+        cluster_y = rng.randint(0, rows - cluster_size)
+        terrain_grid[cluster_y:cluster_y + cluster_size,
+                     cluster_x:cluster_x + cluster_size] = WATER
+
+
+def stamp_lakes(terrain_grid, rng, margin=0):
+    """
+    Stamps circular lakes and irregular pools of water onto the terrain grid.
+
+    Args:
+        terrain_grid (numpy.ndarray): Grid of terrain kinds, modified in place.
+        rng (random.Random): Random number generator to draw from.
+        margin (int): Number of tiles along each edge that are kept free of water.
+    """
+    rows, cols = terrain_grid.shape
+    tile_rows, tile_cols = np.ogrid[:rows, :cols]
+    num_clusters = rng.randint(3, 5)  # Number of water bodies
+
+    for _ in range(num_clusters):
+        cluster_size = rng.randint(3, 7)  # Random size for each water body
+        cluster_x = rng.randint(margin, cols - cluster_size - margin)
+        cluster_y = rng.randint(margin, rows - cluster_size - margin)
+
+        # Decide if this will be a circular lake or a rectangular pool
+        if rng.random() < 0.5:  # 50% chance of circular lake
+            radius = cluster_size // 2
+            center_x = cluster_x + radius
+            center_y = cluster_y + radius
+            # Circle formula: (x - cx)^2 + (y - cy)^2 < r^2
+            lake = (tile_rows - center_y) ** 2 + (tile_cols - center_x) ** 2 < radius ** 2
+            terrain_grid[lake] = WATER
+
+        else:  # Otherwise, make an irregular pool (blocky but distorted)
+            # One roll per tile, in row order, to add some randomness to edges
+            rolls = np.array([rng.random() for _ in range(cluster_size * cluster_size)])
+            pool = rolls.reshape(cluster_size, cluster_size) > 0.2
+            terrain_grid[cluster_y:cluster_y + cluster_size,
+                         cluster_x:cluster_x + cluster_size][pool] = WATER
+
+
+def add_outlines(terrain_grid):
+    """
+    Marks grass tiles next to water as outline tiles.
+
+    This creates a visual and functional border around water bodies by marking
+    grass tiles that share an edge (N, S, E or W) with a water tile. The water
+    mask is shifted one tile in each direction instead of visiting every tile.
+    Original implementation inspired by Marcus Møller's tilemap engine
+    See: https://github.com/marcusmoller/pyweek17-miner/blob/master/miner/engine.py#L202-L220
+
+    Args:
+        terrain_grid (numpy.ndarray): Grid of terrain kinds, modified in place.
+    """
+    water = terrain_grid == WATER
+    near_water = np.zeros_like(water)
+    near_water[:-1, :] |= water[1:, :]   # Tile above (North of) water
+    near_water[1:, :] |= water[:-1, :]   # Tile below (South of) water
+    near_water[:, :-1] |= water[:, 1:]   # Tile to the left (West of) water
+    near_water[:, 1:] |= water[:, :-1]   # Tile to the right (East of) water
+    terrain_grid[near_water & (terrain_grid == GRASS)] = OUTLINE
+
+
+class FreeTiles:
+    """
+    Index of the free walkable tiles of a map, for spawning in constant time.
+
+    The free tiles are kept packed at the front of a list, and the position
+    of every tile in that list is kept in a second list. Claiming a tile
+    swaps it with the last free tile and shrinks the free count by one, and
+    sampling picks a random position below the count. Both take constant
+    time however much of the map is water or already taken, so spawning
+    never has to retry.
+
+    Attributes:
+        shape (tuple): (rows, cols) of the terrain grid
+        tiles (list): Row-major tile indices; the first count are free
+        slots (list): Position of each tile in tiles
+        count (int): Number of free tiles
+    """
+    def __init__(self, terrain_grid):
+        """
+        Indexes every tile that is not water as free.
+
+        Args:
+            terrain_grid (numpy.ndarray): Grid of terrain kinds.
+        """
+        self.shape = terrain_grid.shape
+        water = (terrain_grid == WATER).ravel()
+        self.tiles = np.concatenate((np.flatnonzero(~water), np.flatnonzero(water))).tolist()
+        self.slots = [0] * len(self.tiles)
+        for slot, tile in enumerate(self.tiles):
+            self.slots[tile] = slot
+        self.count = int(len(water) - water.sum())
+
+    def __len__(self):
+        """
+        Gets the number of free tiles.
+
+        Returns:
+            int: Number of free tiles.
+        """
+        return self.count
+
+    def is_free(self, row, col):
+        """
+        Checks whether a tile is free.
+
+        Args:
+            row (int): Tile row.
+            col (int): Tile column.
+
+        Returns:
+            bool: True if the tile is walkable and not claimed.
+        """
+        return self.slots[row * self.shape[1] + col] < self.count
+
+    def claim(self, row, col):
+        """
+        Marks a tile as taken, if it is free.
+
+        Args:
+            row (int): Tile row.
+            col (int): Tile column.
+
+        Returns:
+            bool: True if the tile was free.
+        """
+        tile = row * self.shape[1] + col
+        slot = self.slots[tile]
+        if slot >= self.count:
+            return False
+        # Swap the tile with the last free one, then shrink the free part
+        last = self.count - 1
+        moved = self.tiles[last]
+        self.tiles[slot], self.tiles[last] = moved, tile
+        self.slots[moved], self.slots[tile] = slot, last
+        self.count = last
+        return True
+
+    def sample(self, rng, spacing=1):
+        """
+        Picks a random free tile and claims it.
+
+        The tiles within spacing of it are claimed too, so sprites larger
+        than a tile spawned on later picks do not overlap it.
+
+        Args:
+            rng (random.Random): Random number generator to draw from.
+            spacing (int): How many tiles around the pick to claim.
+
+        Returns:
+            tuple: (row, col) of the tile, or None if no tile is free.
+        """
+        if not self.count:
+            return None
+        row, col = divmod(self.tiles[rng.randrange(self.count)], self.shape[1])
+        rows, cols = self.shape
+        for claim_row in range(max(0, row - spacing), min(rows, row + spacing + 1)):
+            for claim_col in range(max(0, col - spacing), min(cols, col + spacing + 1)):
+                self.claim(claim_row, claim_col)
+        return row, col
+
+
+class World:
+    """
+    Everything generated for one map: terrain, objects and enemies.
+
+    Attributes:
+        seed (int): Seed the map was generated from
+        terrain (numpy.ndarray): Grid of terrain kinds
+        object_positions (list): (x, y) pixel position of each object
+        object_collided (list): Whether each object has been opened by the player
+        enemies (EnemyStore): Enemies on the map
+        lakes (bool): Whether the terrain was generated with lakes and pools
+        object_grid (SpatialHash): Index of each object, bucketed by position
+    """
+    def __init__(self, seed, terrain, object_positions, enemies, lakes=False):
+        """
+        Initializes a world from generated content.
+
+        Args:
+            seed (int): Seed the map was generated from.
+            terrain (numpy.ndarray): Grid of terrain kinds.
+            object_positions (list): (x, y) pixel position of each object.
+            enemies (EnemyStore): Enemies on the map.
+            lakes (bool): Whether the terrain has lakes and pools instead of
+                square clusters of water.
+        """
+        self.seed = seed
+        self.terrain = terrain
+        self.object_positions = object_positions
+        self.object_collided = [False] * len(object_positions)
+        self.enemies = enemies
+        self.lakes = lakes
+        # Objects never move, so their buckets are filled once
+        self.object_grid = SpatialHash()
+        for index, (object_x, object_y) in enumerate(object_positions):
+            self.object_grid.add(index, (object_x // self.object_grid.cell_size,
+                                         object_y // self.object_grid.cell_size))
+
+
+def generate_terrain(seed, lakes=False, rows=MAP_ROWS, cols=MAP_COLS):
+    """
+    Generates the terrain of a map, with water and its outlines.
+
+    Args:
+        seed (int): World seed.
+        lakes (bool): Use circular lakes and irregular pools instead of square
+            clusters of water.
+        rows (int): Number of tile rows.
+        cols (int): Number of tile columns.
+
+    Returns:
+        numpy.ndarray: Grid of terrain kinds.
+    """
+    rng = stream(seed, "terrain")
+    terrain = new_terrain(rows, cols)
+    if lakes:
+        stamp_lakes(terrain, rng)
+    else:
+        stamp_clusters(terrain, rng)
+    # Outline the water for collision detection
+    add_outlines(terrain)
+    return terrain
+
+
+def generate_objects(seed, free_tiles):
+    """
+    Generates the positions of the objects (treasure chests) of a map.
+
+    Args:
+        seed (int): World seed.
+        free_tiles (FreeTiles): Free tiles of the map. The tiles taken by
+            the objects are claimed.
+
+    Returns:
+        list: (x, y) pixel position of each object.
+    """
+    rng = stream(seed, "objects")
+    num_objects = rng.randint(1, 4)  # Generate 1-4 random objects on the map
+    object_positions = []  # List to store (x,y) coordinates of each object
+    for _ in range(num_objects):
+        tile = free_tiles.sample(rng)
+        if tile is None:
+            break  # No free tile left
+        # Convert the grid position to pixel coordinates
+        object_positions.append((tile[1] * TILE_SIZE[0], tile[0] * TILE_SIZE[1]))
+    return object_positions
+
+
+def generate_enemies(seed, free_tiles):
+    """
+    Generates the enemies of a map.
+
+    Args:
+        seed (int): World seed.
+        free_tiles (FreeTiles): Free tiles of the map. The tiles taken by
+            the enemies are claimed.
+
+    Returns:
+        EnemyStore: The map's enemies.
+    """
+    rng = stream(seed, "enemies")
+    num_enemies = rng.randint(1, 3)  # Generate 1-3 enemies
+    enemy_positions = []
+    for _ in range(num_enemies):
+        tile = free_tiles.sample(rng)
+        if tile is None:
+            break  # No free tile left
+        # Convert the grid position to pixel coordinates
+        enemy_positions.append((tile[1] * TILE_SIZE[0], tile[0] * TILE_SIZE[1]))
+    enemies = EnemyStore()
+    enemies.spawn(enemy_positions, ENEMY_HP)
+    return enemies
+
+
+def generate_world(seed, lakes=False):
+    """
+    Generates the terrain, objects and enemies of a map from a seed.
+
+    The stages use separate random streams. Objects and enemies are placed,
+    in that order, on the tiles the terrain and the earlier spawns left free.
+
+    Args:
+        seed (int): Random seed. The same seed always generates the same map.
+        lakes (bool): Use circular lakes and irregular pools (as when the map is
+            regenerated with Enter) instead of square clusters of water.
+
+    Returns:
+        World: The generated map.
+    """
+    terrain = generate_terrain(seed, lakes)
+    free_tiles = FreeTiles(terrain)
+    object_positions = generate_objects(seed, free_tiles)
+    enemies = generate_enemies(seed, free_tiles)
+    return World(seed, terrain, object_positions, enemies, lakes)
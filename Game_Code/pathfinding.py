@@ -0,0 +1,155 @@
+"""
+Flow-field pathfinding for the Procedurally-Generated 2D Role-Playing Game.
+
+Instead of searching a path for every enemy, one distance field is computed
+from the player's tile over the walkable tiles, and every enemy simply steps
+to the neighbouring tile that is closest to the player. The field only has to
+be recomputed when the player enters another tile, so the cost per enemy is a
+few array lookups no matter how many enemies there are.
+"""
+import numpy as np
+
+# Row and column offsets of the four neighbouring tiles
+NEIGHBORS = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])
+UNREACHABLE = np.iinfo(np.int32).max  # Distance used for blocked or too distant tiles
+
+
+def distance_field(walkable, start, max_distance=None):
+    """
+    Computes the walking distance from a tile to every reachable tile.
+
+    Runs a breadth-first wavefront over the grid, growing the whole frontier
+    by one step at a time with array shifts. Movement is 4-connected.
+
+    Args:
+        walkable (numpy.ndarray): Boolean grid of tiles that can be walked on.
+        start (tuple): (row, col) tile the distances are measured from. It
+            counts as reachable even if it is not walkable.
+        max_distance (int): Stop after this many steps, or None to cover
+            every reachable tile.
+
+    Returns:
+        numpy.ndarray: int32 grid of distances in tiles, -1 where a tile is
+        blocked, unreachable or further than max_distance.
+    """
+    rows, cols = walkable.shape
+    distances = np.full((rows, cols), -1, dtype=np.int32)
+    row, col = start
+    if not (0 <= row < rows and 0 <= col < cols):
+        return distances
+    frontier = np.zeros((rows, cols), dtype=bool)
+    frontier[row, col] = True
+    distances[row, col] = 0
+    step = 0
+    while frontier.any() and (max_distance is None or step < max_distance):
+        step += 1
+        # Tiles next to the frontier, in any of the four directions
+        grown = np.zeros_like(frontier)
+        grown[1:] |= frontier[:-1]
+        grown[:-1] |= frontier[1:]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        frontier = grown & walkable & (distances < 0)
+        distances[frontier] = step
+    return distances
+
+
+class FlowField:
+    """
+    A distance field toward the player, shared by every enemy.
+
+    The grid can be a whole map or a window of a larger world; origin gives
+    the world tile coordinates of its top-left tile.
+
+    Attributes:
+        walkable (numpy.ndarray): Boolean grid of tiles that can be walked on
+        origin (tuple): (row, col) world tile of the grid's top-left tile
+        max_distance (int): How many tiles from the target the field reaches
+        target (tuple): (row, col) world tile the field leads to, or None
+        padded (numpy.ndarray): Distances with a border of UNREACHABLE tiles,
+            and UNREACHABLE for blocked tiles, or None before the first target
+        updates (int): Number of times the field has been recomputed
+    """
+    def __init__(self, max_distance=None):
+        """
+        Initializes a flow field with no grid.
+
+        Args:
+            max_distance (int): How many tiles from the target the field
+                reaches, or None for the whole grid.
+        """
+        self.walkable = None
+        self.origin = (0, 0)
+        self.max_distance = max_distance
+        self.target = None
+        self.padded = None
+        self.updates = 0
+
+    def set_grid(self, walkable, origin=(0, 0)):
+        """
+        Sets the grid the field is computed over.
+
+        Args:
+            walkable (numpy.ndarray): Boolean grid of tiles that can be walked on.
+            origin (tuple): (row, col) world tile of the grid's top-left tile.
+        """
+        self.walkable = walkable
+        self.origin = origin
+        self.target = None
+        self.padded = None
+
+    def set_target(self, row, col):
+        """
+        Points the field at a tile, recomputing it only if the tile changed.
+
+        Args:
+            row (int): World tile row of the target.
+            col (int): World tile column of the target.
+
+        Returns:
+            bool: True if the field was recomputed.
+        """
+        if (row, col) == self.target and self.padded is not None:
+            return False
+        self.target = (row, col)
+        distances = distance_field(self.walkable,
+                                   (row - self.origin[0], col - self.origin[1]),
+                                   self.max_distance)
+        rows, cols = distances.shape
+        self.padded = np.full((rows + 2, cols + 2), UNREACHABLE, dtype=np.int32)
+        self.padded[1:-1, 1:-1] = np.where(distances >= 0, distances, UNREACHABLE)
+        self.updates += 1
+        return True
+
+    def steer(self, rows, cols):
+        """
+        Picks the next tile for each of a batch of walkers.
+
+        Args:
+            rows (numpy.ndarray): World tile row of each walker.
+            cols (numpy.ndarray): World tile column of each walker.
+
+        Returns:
+            tuple: (next_rows, next_cols, moving) arrays. moving is False for
+            walkers that have reached the target, are outside the grid or
+            cannot get any closer; their next tile is their current one.
+        """
+        grid_rows, grid_cols = self.padded.shape
+        # Positions in the padded grid; walkers outside the grid land on the border
+        local_rows = np.clip(rows - self.origin[0] + 1, 0, grid_rows - 1)
+        local_cols = np.clip(cols - self.origin[1] + 1, 0, grid_cols - 1)
+        inside = ((local_rows > 0) & (local_rows < grid_rows - 1) &
+                  (local_cols > 0) & (local_cols < grid_cols - 1))
+
+        current = self.padded[local_rows, local_cols]
+        # Distance of each walker's four neighbours: (walkers, 4)
+        neighbor_rows = np.clip(local_rows[:, None] + NEIGHBORS[:, 0], 0, grid_rows - 1)
+        neighbor_cols = np.clip(local_cols[:, None] + NEIGHBORS[:, 1], 0, grid_cols - 1)
+        neighbor = self.padded[neighbor_rows, neighbor_cols]
+        best = np.argmin(neighbor, axis=1)
+        best_distance = neighbor[np.arange(len(best)), best]
+        moving = inside & (best_distance < current)
+
+        next_rows = np.where(moving, rows + NEIGHBORS[best, 0], rows)
+        next_cols = np.where(moving, cols + NEIGHBORS[best, 1], cols)
+        return next_rows, next_cols, moving
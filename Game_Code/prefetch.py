@@ -0,0 +1,94 @@
+"""
+Background map generation for the Procedurally-Generated 2D Role-Playing Game.
+
+Keeps the next maps ready on a worker thread so that pressing Enter can swap
+in a new map without generating it during a frame. Seeds whose maps are not
+playable are re-rolled on the worker thread too.
+"""
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis import find_playable_world
+
+
+class WorldPrefetcher:
+    """
+    Generates upcoming maps in the background and hands them out on request.
+
+    A small queue (double buffer by default) of maps is always being built or
+    ready on a single worker thread. Taking a map immediately queues the
+    generation of a replacement. Seeds for the new maps are drawn from the
+    prefetcher's own random number generator, and re-rolled until their map
+    passes the seed analysis (see analysis.find_playable_world).
+
+    Attributes:
+        depth (int): Number of maps kept ready or in progress
+        lakes (bool): Whether maps are generated with lakes (as on Enter)
+        rooms (bool): Whether maps are analyzed as rooms, with exits
+        rng (random.Random): Generator used to pick the seeds of new maps
+        executor (ThreadPoolExecutor): Worker thread generating the maps
+        pending (collections.deque): Futures of the (map, report) pairs,
+            oldest first
+        report (MapReport): Analysis of the last map taken, or None
+    """
+    def __init__(self, depth=2, lakes=True, rng=None, rooms=False):
+        """
+        Starts generating the first maps in the background.
+
+        Args:
+            depth (int): Number of maps to keep ready or in progress.
+            lakes (bool): Generate maps with lakes and pools instead of clusters.
+            rng (random.Random): Generator for picking seeds. Defaults to a new
+                generator seeded from the system.
+            rooms (bool): Analyze the maps as rooms, requiring their exits to
+                be reachable.
+        """
+        self.depth = depth
+        self.lakes = lakes
+        self.rooms = rooms
+        self.rng = rng if rng is not None else random.Random()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="worldgen")
+        self.pending = deque()
+        self.report = None
+        self.fill()
+
+    def next_seed(self):
+        """
+        Picks the seed of the next map to generate.
+
+        Returns:
+            int: A short (at most 5 digit) seed.
+        """
+        return self.rng.randrange(100000)
+
+    def fill(self):
+        """
+        Queues map generation until depth maps are ready or in progress.
+        """
+        while len(self.pending) < self.depth:
+            self.pending.append(self.executor.submit(find_playable_world, self.next_seed(),
+                                                     self.lakes, self.rooms))
+
+    def take(self):
+        """
+        Takes the oldest prepared map and starts preparing a replacement.
+
+        Waits for the map to finish only if it is still being generated.
+
+        Returns:
+            World: The next map.
+        """
+        world, self.report = self.pending.popleft().result()
+        self.fill()
+        return world
+
+    def close(self):
+        """
+        Stops the worker thread, dropping maps that have not been started.
+        """
+        # Cancel the queued maps by hand: shutdown(cancel_futures=True) needs Python 3.9
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False)
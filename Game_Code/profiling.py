@@ -0,0 +1,164 @@
+"""
+Frame-time instrumentation for the Procedurally-Generated 2D Role-Playing Game.
+
+Times each phase of a frame (event polling, game rules, drawing, presenting
+and waiting for the frame cap) with time.perf_counter_ns, keeps rolling
+percentiles over the last frames and exports the samples to CSV or JSON.
+"""
+import csv
+import json
+from array import array
+from time import perf_counter_ns
+
+import numpy as np
+
+# Phases of one frame of the interactive game, in the order they run
+FRAME_PHASES = (
+    "events",  # Polling the event queue
+    "input",  # Reading the keyboard into Inputs
+    "attack",  # Movement input and attack resolution
+    "cooldown",  # Weapon cooldown and selection
+    "collision",  # Bounds, water collision and room exits
+    "enemies",  # Enemy movement along the flow field
+    "objects",  # Object collision and removal of dead enemies
+    "terrain",  # Drawing the terrain
+    "entities",  # Drawing objects, enemies, the player and the weapon
+    "overlay",  # Drawing the frame-time overlay
+    "dirty",  # Finding the parts of the screen that changed (dirty-rect mode)
+    "present",  # pygame.display.update
+    "tick",  # Waiting for the frame cap
+)
+
+
+class FrameProfiler:
+    """
+    Records how long each phase of every frame takes.
+
+    A frame is timed by calling begin(), then lap() at the end of each phase,
+    then end(). Each lap is charged the time since the previous lap, so the
+    phases of a frame add up to its total time and timing costs two calls to
+    perf_counter_ns per phase. Percentiles are computed from a rolling window
+    of the most recent frames; the full history is only kept when it is going
+    to be exported.
+
+    Attributes:
+        phases (tuple): Names of the phases, in column order
+        window (int): Number of recent frames the percentiles cover
+        samples (numpy.ndarray): (window, phases) ring buffer of phase times
+            in nanoseconds
+        frames (int): Number of frames recorded so far
+        history (array.array): Every recorded phase time in nanoseconds, frame
+            by frame, or None if the history is not kept
+    """
+    def __init__(self, phases=FRAME_PHASES, window=600, keep_history=False):
+        """
+        Initializes a profiler with no recorded frames.
+
+        Args:
+            phases (tuple): Names of the phases.
+            window (int): Number of recent frames the percentiles cover.
+            keep_history (bool): Keep every sample for export, not only the
+                rolling window.
+        """
+        self.phases = tuple(phases)
+        self.window = window
+        self.samples = np.zeros((window, len(self.phases)), dtype=np.int64)
+        self.frames = 0
+        self.history = array('q') if keep_history else None
+        self._index = {name: i for i, name in enumerate(self.phases)}
+        self._row = [0] * len(self.phases)
+        self._last = 0
+
+    def begin(self):
+        """
+        Starts timing a frame.
+        """
+        self._row = [0] * len(self.phases)
+        self._last = perf_counter_ns()
+
+    def lap(self, phase):
+        """
+        Ends a phase, charging it the time since the previous lap.
+
+        A phase that runs several times in a frame accumulates its time.
+
+        Args:
+            phase (str): Name of the phase that just finished.
+        """
+        now = perf_counter_ns()
+        self._row[self._index[phase]] += now - self._last
+        self._last = now
+
+    def end(self):
+        """
+        Finishes timing a frame and records its phase times.
+        """
+        self.samples[self.frames % self.window] = self._row
+        if self.history is not None:
+            self.history.extend(self._row)
+        self.frames += 1
+
+    def recent(self):
+        """
+        Gets the phase times of the frames in the rolling window.
+
+        Returns:
+            numpy.ndarray: (frames, phases) phase times in nanoseconds.
+        """
+        return self.samples[:min(self.frames, self.window)]
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """
+        Computes percentiles of each phase and of the whole frame.
+
+        Args:
+            quantiles (tuple): Percentiles to compute, from 0 to 100.
+
+        Returns:
+            dict: List of percentiles in milliseconds for each phase name and
+            for "frame", in the order of quantiles. Empty if no frame has been
+            recorded.
+        """
+        recent = self.recent()
+        if not len(recent):
+            return {}
+        columns = np.column_stack((recent, recent.sum(axis=1)))
+        values = np.percentile(columns, quantiles, axis=0) / 1e6
+        names = self.phases + ("frame",)
+        return {name: values[:, i].tolist() for i, name in enumerate(names)}
+
+    def export(self, path):
+        """
+        Writes the recorded phase times to a file.
+
+        The format is picked from the file extension: ".csv" writes one row
+        per frame with a column per phase, anything else writes JSON with the
+        samples and the percentiles. Times are in nanoseconds. Exports the full
+        history if it is kept, otherwise the rolling window.
+
+        Args:
+            path (str): File to write.
+        """
+        if self.history is not None:
+            rows = np.frombuffer(self.history, dtype=np.int64).reshape(-1, len(self.phases))
+        else:
+            # Oldest frame first once the ring buffer has wrapped around
+            rows = np.roll(self.recent(), -(self.frames % self.window), axis=0) \
+                if self.frames > self.window else self.recent()
+
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(("frame",) + self.phases + ("total",))
+                first = self.frames - len(rows)
+                for i, row in enumerate(rows.tolist()):
+                    writer.writerow([first + i] + row + [sum(row)])
+        else:
+            with open(path, "w") as file:
+                json.dump({
+                    "unit": "ns",
+                    "phases": list(self.phases),
+                    "frames": self.frames,
+                    "percentiles_ms": {"quantiles": [50, 95, 99], **self.percentiles()},
+                    "samples": rows.tolist(),
+                }, file)
@@ -0,0 +1,905 @@
+"""
+Rendering helpers for the Procedurally-Generated 2D Role-Playing Game.
+
+Provides the sprite cache, pre-scaled animations, the terrain texture atlas,
+the cached terrain layers and the renderer that draws complete frames of the game.
+"""
+import os
+import weakref
+
+import numpy as np
+import pygame
+
+from engine import CHARACTER_SIZE, OBJECT_SIZE
+from generation import GRASS, TILE_SIZE
+
+GRASS_VARIANT_SHARE = 6  # One grass tile in this many is drawn with a grass variant
+DECORATION_SHARE = 24  # One plain grass tile in this many has a decoration drawn on it
+CULL_MARGIN = 100  # Pixels beyond the view an enemy may stand and still be drawn, covering its sprite and health bar
+
+
+class AssetCache:
+    """
+    Loads sprite images once and hands out the same converted surface afterwards.
+
+    Surfaces are cached by file name, target size and alpha mode, so asking for
+    an image that was already loaded (for example when switching weapons every
+    frame while a number key is held) is a dictionary lookup instead of a disk
+    read, decode and rescale. Each file is decoded only once even when it is
+    used at several sizes.
+
+    Attributes:
+        root (str): Directory that image file names are relative to
+        surfaces (dict): Cached surfaces keyed by (name, size, alpha)
+    """
+    def __init__(self, root='Assets'):
+        """
+        Initializes an empty cache.
+
+        Args:
+            root (str): Directory containing the image files.
+        """
+        self.root = root
+        self.surfaces = {}
+
+    def get(self, name, size=None, alpha=True):
+        """
+        Gets an image, loading and converting it on first use.
+
+        Must be called after the display mode has been set, since surfaces are
+        converted to the display's pixel format.
+
+        Args:
+            name (str): Image file name, relative to the asset directory.
+            size (tuple): Width and height to scale the image to, or None to
+                keep the original size.
+            alpha (bool): Whether to keep per-pixel transparency.
+
+        Returns:
+            pygame.Surface: The converted (and scaled) image.
+
+        Raises:
+            pygame.error: If the image file cannot be loaded
+        """
+        key = (name, size, alpha)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if size is None:
+                surface = pygame.image.load(os.path.join(self.root, name))
+                surface = surface.convert_alpha() if alpha else surface.convert()
+            else:
+                surface = pygame.transform.scale(self.get(name, None, alpha), size)
+            self.surfaces[key] = surface
+        return surface
+
+    def preload(self, requests):
+        """
+        Loads a list of images ahead of time so later lookups never hit the disk.
+
+        Args:
+            requests (list): (name, size, alpha) tuples, as passed to get().
+        """
+        for name, size, alpha in requests:
+            self.get(name, size, alpha)
+
+
+class Animation:
+    """
+    A looping animation made of frames that are scaled once, when it is created.
+
+    Scaling a frame every time it is drawn is expensive when many sprites are
+    animating at once, so every frame is baked at its final size up front.
+    Playback only has to pick a frame index from the current time.
+
+    Attributes:
+        frames (list): Pre-scaled animation frames
+        frame_ms (int): How long each frame is shown, in milliseconds
+    """
+    def __init__(self, frames, size, frame_ms):
+        """
+        Bakes the animation frames at their target size.
+
+        Args:
+            frames (list): Source frames (pygame.Surface) in playback order.
+            size (tuple): Width and height every frame is drawn at.
+            frame_ms (int): How long each frame is shown, in milliseconds.
+        """
+        self.frames = [pygame.transform.scale(frame, size) for frame in frames]
+        self.frame_ms = frame_ms
+
+    def frame_index(self, ticks):
+        """
+        Gets the index of the frame to show at a given time.
+
+        Args:
+            ticks (int): Shared clock time in milliseconds.
+
+        Returns:
+            int: Index into frames.
+        """
+        return (ticks // self.frame_ms) % len(self.frames)
+
+    def frame(self, ticks):
+        """
+        Gets the frame to show at a given time.
+
+        Args:
+            ticks (int): Shared clock time in milliseconds.
+
+        Returns:
+            pygame.Surface: Pre-scaled animation frame.
+        """
+        return self.frames[self.frame_index(ticks)]
+
+
+class TextureAtlas:
+    """
+    Several sprites packed side by side into one surface.
+
+    Drawing from a single surface lets a whole layer of tiles go through one
+    Surface.blits call, each tile picking its sprite with an area rect.
+
+    Attributes:
+        surface (pygame.Surface): The packed sprites
+        areas (list): Rect of each sprite within the surface, in the order
+            they were given
+    """
+    def __init__(self, images, alpha=False):
+        """
+        Packs the sprites into a new surface.
+
+        Must be called after the display mode has been set.
+
+        Args:
+            images (list): Sprites (pygame.Surface) to pack.
+            alpha (bool): Whether to keep per-pixel transparency. Opaque
+                atlases blit faster.
+        """
+        width = sum(image.get_width() for image in images)
+        height = max((image.get_height() for image in images), default=0)
+        if alpha:
+            self.surface = pygame.Surface((max(width, 1), max(height, 1)), pygame.SRCALPHA).convert_alpha()
+        else:
+            self.surface = pygame.Surface((max(width, 1), max(height, 1))).convert()
+        self.areas = []
+        x = 0
+        for image in images:
+            # Copy the pixels as they are, alpha included, instead of blending them
+            self.surface.blit(image, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.areas.append(pygame.Rect((x, 0), image.get_size()))
+            x += image.get_width()
+
+
+def tile_noise(rows, cols):
+    """
+    Hashes world tile coordinates into well-mixed 32-bit values.
+
+    Used to pick decorative sprites, so every tile always looks the same
+    without drawing from the map's random streams.
+
+    Args:
+        rows (numpy.ndarray): World tile rows.
+        cols (numpy.ndarray): World tile columns.
+
+    Returns:
+        numpy.ndarray: uint32 hash of each tile.
+    """
+    noise = (rows.astype(np.uint32) * np.uint32(0x9E3779B1)) ^ \
+            (cols.astype(np.uint32) * np.uint32(0x85EBCA77))
+    noise ^= noise >> np.uint32(15)
+    noise *= np.uint32(0x2C1B3C6D)
+    noise ^= noise >> np.uint32(12)
+    noise *= np.uint32(0x297A2D39)
+    noise ^= noise >> np.uint32(15)
+    return noise
+
+
+class TerrainTiles:
+    """
+    Terrain sprites packed into atlases, and the sprite drawn on each tile.
+
+    The tile of each terrain kind and the grass variants are opaque and share
+    one atlas; decorations such as trees have transparency and get their own,
+    drawn over the ground. Which grass tiles get a variant or a decoration
+    depends only on their world coordinates, so it is the same every time a
+    map is drawn and seamless across chunk borders. Decorations are purely
+    visual and do not block movement.
+
+    Attributes:
+        tile_size (tuple): Width and height of a terrain tile in pixels
+        ground (TextureAtlas): Tile of each terrain kind, indexed by kind,
+            followed by the grass variants
+        kinds (int): Number of terrain kinds
+        variants (int): Number of grass variants
+        decorations (TextureAtlas): Sprites drawn over grass tiles, or None
+    """
+    def __init__(self, tile_size, tile_imgs, grass_variants=(), decorations=()):
+        """
+        Packs the terrain sprites.
+
+        Must be called after the display mode has been set.
+
+        Args:
+            tile_size (tuple): Width and height of a terrain tile in pixels.
+            tile_imgs (list): Tile image for each terrain kind (GRASS, WATER, OUTLINE).
+            grass_variants (list): Opaque images used instead of the grass tile
+                on some grass tiles.
+            decorations (list): Transparent images drawn on some grass tiles.
+        """
+        self.tile_size = tile_size
+        self.ground = TextureAtlas(list(tile_imgs) + list(grass_variants))
+        self.kinds = len(tile_imgs)
+        self.variants = len(grass_variants)
+        self.decorations = TextureAtlas(decorations, alpha=True) if decorations else None
+
+    def blit_sequences(self, terrain, origin, offsets, bounds):
+        """
+        Builds the Surface.blits sequences that draw a terrain grid.
+
+        Args:
+            terrain (numpy.ndarray): Grid of terrain kinds.
+            origin (tuple): (row, col) world tile of the grid's top-left tile.
+            offsets (list): (x, y) pixel positions to draw a copy of the grid at.
+            bounds (tuple): Width and height of the target surface. Tiles whose
+                top-left corner falls outside it are skipped.
+
+        Returns:
+            tuple: (ground, decorations) lists of (atlas, dest, area) entries,
+            in drawing order.
+        """
+        rows, cols = np.indices(terrain.shape)
+        noise = tile_noise(rows + origin[0], cols + origin[1]).ravel()
+        kinds = terrain.ravel().astype(np.intp)
+        grass = kinds == GRASS
+        if self.variants:
+            # One grass tile in GRASS_VARIANT_SHARE gets one of the variants
+            varied = grass & (noise % GRASS_VARIANT_SHARE == 0)
+            kinds[varied] = self.kinds + (noise[varied] >> 8) % self.variants
+            grass &= ~varied
+        decorated = np.zeros_like(grass)
+        if self.decorations is not None:
+            decorated = grass & ((noise >> 16) % DECORATION_SHARE == 0)
+            decoration_kinds = ((noise >> 24) % len(self.decorations.areas)).tolist()
+
+        width, height = bounds
+        xs = cols.ravel() * self.tile_size[0]
+        ys = rows.ravel() * self.tile_size[1]
+        ground_areas = self.ground.areas
+        ground, decorations = [], []
+        for offset_x, offset_y in offsets:
+            x = xs + offset_x
+            y = ys + offset_y
+            # Ensure tiles are within the surface's boundaries before drawing
+            inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+            tiles = np.flatnonzero(inside)
+            ground += [(self.ground.surface, dest, ground_areas[kind])
+                       for dest, kind in zip(zip(x[tiles].tolist(), y[tiles].tolist()),
+                                             kinds[tiles].tolist())]
+            tiles = np.flatnonzero(inside & decorated)
+            if len(tiles):
+                decorations += [(self.decorations.surface, dest,
+                                 self.decorations.areas[decoration_kinds[tile]])
+                                for dest, tile in zip(zip(x[tiles].tolist(), y[tiles].tolist()),
+                                                      tiles.tolist())]
+        return ground, decorations
+
+    def draw(self, surface, terrain, origin, offsets):
+        """
+        Draws a terrain grid with one Surface.blits call per layer.
+
+        Args:
+            surface (pygame.Surface): Surface to draw onto.
+            terrain (numpy.ndarray): Grid of terrain kinds.
+            origin (tuple): (row, col) world tile of the grid's top-left tile.
+            offsets (list): (x, y) pixel positions to draw a copy of the grid at.
+        """
+        ground, decorations = self.blit_sequences(terrain, origin, offsets, surface.get_size())
+        surface.blits(ground, doreturn=False)
+        if decorations:
+            surface.blits(decorations, doreturn=False)
+
+
+class TerrainLayer:
+    """
+    Caches the rendered terrain grid on an off-screen surface.
+
+    Drawing the terrain tile by tile costs thousands of blits per frame, so the
+    grid is rendered once into a surface the size of the window and then drawn
+    with a single blit. The cached surface is rebuilt only when the terrain is
+    regenerated or the window is resized.
+
+    Attributes:
+        tiles (TerrainTiles): Terrain sprites to draw the grid with
+        terrain_grid (numpy.ndarray): Grid of terrain kinds currently being rendered
+        surface (pygame.Surface): Cached terrain image, or None when stale
+    """
+    def __init__(self, tiles):
+        """
+        Initializes an empty terrain layer.
+
+        Args:
+            tiles (TerrainTiles): Terrain sprites to draw the grid with.
+        """
+        self.tiles = tiles
+        self.terrain_grid = None
+        self.surface = None
+
+    def set_grid(self, terrain_grid):
+        """
+        Sets the terrain grid to render and marks the cache as stale.
+
+        Args:
+            terrain_grid (numpy.ndarray): Newly generated terrain grid.
+        """
+        self.terrain_grid = terrain_grid
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Discards the cached surface so it is rebuilt on the next draw.
+        """
+        self.surface = None
+
+    def render(self, size):
+        """
+        Renders the terrain grid into a new off-screen surface.
+
+        Args:
+            size (tuple): Width and height of the surface (the window size).
+
+        Returns:
+            pygame.Surface: Surface holding the fully drawn terrain.
+        """
+        surface = pygame.Surface(size).convert()
+        surface.fill((0, 0, 0))  # Black behind tiles, same as clearing the screen
+        rows, cols = self.terrain_grid.shape
+        grid_width = cols * self.tiles.tile_size[0]
+        grid_height = rows * self.tiles.tile_size[1]
+
+        # Draw a 3x3 grid of copies around the current view to allow seamless map wrapping
+        offsets = [(i * grid_width, j * grid_height) for i in range(-1, 2) for j in range(-1, 2)]
+        self.tiles.draw(surface, self.terrain_grid, (0, 0), offsets)
+        return surface
+
+    def draw(self, screen):
+        """
+        Draws the cached terrain to the screen, rebuilding it if stale.
+
+        Args:
+            screen (pygame.Surface): Display surface to draw onto.
+        """
+        if self.surface is None or self.surface.get_size() != screen.get_size():
+            self.surface = self.render(screen.get_size())
+        screen.blit(self.surface, (0, 0))
+
+
+class ChunkLayer:
+    """
+    Draws the visible part of an infinite ChunkWorld.
+
+    Each chunk's terrain is rendered once into its own surface the first time
+    it comes into view. Surfaces are held only as long as their chunk is, so
+    chunks dropped by the world's cache also free their images.
+
+    Attributes:
+        tiles (TerrainTiles): Terrain sprites to draw the chunks with
+        surfaces (weakref.WeakKeyDictionary): Rendered surface of each chunk
+    """
+    def __init__(self, tiles):
+        """
+        Initializes the layer with no rendered chunks.
+
+        Args:
+            tiles (TerrainTiles): Terrain sprites to draw the chunks with.
+        """
+        self.tiles = tiles
+        self.surfaces = weakref.WeakKeyDictionary()
+
+    def render(self, chunk):
+        """
+        Renders a chunk's terrain into a new surface.
+
+        Args:
+            chunk (Chunk): Chunk to render.
+
+        Returns:
+            pygame.Surface: Surface holding the chunk's terrain.
+        """
+        rows, cols = chunk.terrain.shape
+        tile_w, tile_h = self.tiles.tile_size
+        surface = pygame.Surface((cols * tile_w, rows * tile_h)).convert()
+        surface.fill((0, 0, 0))
+        self.tiles.draw(surface, chunk.terrain, (chunk.cy * rows, chunk.cx * cols), [(0, 0)])
+        return surface
+
+    def draw(self, screen, chunk_world, camera):
+        """
+        Draws every chunk in view.
+
+        Args:
+            screen (pygame.Surface): Display surface to draw onto.
+            chunk_world (ChunkWorld): World to draw.
+            camera (tuple): World pixel position of the screen's top-left corner.
+        """
+        view_w, view_h = screen.get_size()
+        for chunk in chunk_world.in_rect(camera[0], camera[1], view_w, view_h):
+            surface = self.surfaces.get(chunk)
+            if surface is None:
+                surface = self.surfaces[chunk] = self.render(chunk)
+            screen.blit(surface, (chunk.origin[0] - camera[0], chunk.origin[1] - camera[1]))
+
+
+class GameRenderer:
+    """
+    Draws complete frames of a GameState.
+
+    All sprites are loaded and scaled through the asset cache when the
+    renderer is created, and the terrain is drawn from a cached layer, so
+    drawing a frame only blits ready-made surfaces.
+
+    Attributes:
+        assets (AssetCache): Cache the sprites were loaded from
+        character_img (pygame.Surface): Player sprite
+        character_rect (pygame.Rect): Player sprite bounds on screen
+        weapon_img (pygame.Surface): Sprite of the equipped weapon
+        weapon_rect (pygame.Rect): Weapon sprite bounds on screen
+        enemy_imgs (list): Enemy sprites, indexed by enemy type id
+        death_animation (Animation): Enemy death effect
+        object_img (pygame.Surface): Closed treasure chest sprite
+        object_collision_img (pygame.Surface): Opened treasure chest sprite
+        terrain_tiles (TerrainTiles): Terrain sprite atlases
+        terrain_layer (TerrainLayer): Cached terrain of the current map
+        chunk_layer (ChunkLayer): Cached terrain of the chunks in infinite mode
+        profiler (FrameProfiler): Profiler charged with the drawing phases, or
+            None to skip timing
+        dirty_rects (bool): Whether only the changed parts of the screen are
+            redrawn
+        last_sprites (list): Draw list of the previous frame
+    """
+    def __init__(self, assets, weapons, dirty_rects=False):
+        """
+        Loads every sprite the game draws.
+
+        Must be called after the display mode has been set.
+
+        Args:
+            assets (AssetCache): Cache to load the sprites through.
+            weapons (list): Weapons whose sprites may be drawn.
+            dirty_rects (bool): Redraw only the changed parts of the screen.
+        """
+        self.assets = assets
+
+        # Load every sprite up front; lookups after this return cached surfaces
+        assets.preload(
+            [(weapon.get_img(), (weapon.get_scale(), weapon.get_scale()), True)
+             for weapon in weapons] + [
+                ('character.png', CHARACTER_SIZE, True),
+                ('enemy1.png', (60, 60), True),
+                ('enemy2.png', (60, 60), True),
+                ('enemy_death1.png', (180, 240), True),
+                ('enemy_death2.png', (180, 240), True),
+                ('object.png', OBJECT_SIZE, True),
+                ('object_collision.png', OBJECT_SIZE, True),
+                ('grass.png', None, False),
+                ('water.png', None, False),
+                ('water_outline.png', TILE_SIZE, False),
+                ('grass_a.png', TILE_SIZE, False),
+                ('grass_b.png', TILE_SIZE, False),
+                ('grass_d.png', TILE_SIZE, False),
+                ('tree1.png', TILE_SIZE, True),
+            ])
+
+        # Load character image, scaled for better visibility
+        self.character_img = assets.get('character.png', CHARACTER_SIZE)
+        self.character_rect = self.character_img.get_rect()
+        self.weapon = None
+        self.weapon_img = None
+        self.weapon_rect = None
+
+        # Load enemy images, resized for consistency (indexed by enemy type id)
+        self.enemy_imgs = [
+            assets.get('enemy1.png', (60, 60)),
+            assets.get('enemy2.png', (60, 60))
+        ]
+
+        # Load enemy death animation frames, baked at the enemy sprite size
+        enemy_death_imgs = [
+            assets.get('enemy_death1.png', (180, 240)),
+            assets.get('enemy_death2.png', (180, 240))
+        ]
+        self.death_animation = Animation(enemy_death_imgs, (60, 60), 200)
+
+        # Load object images, scaled for consistency
+        self.object_img = assets.get('object.png', OBJECT_SIZE)
+        self.object_collision_img = assets.get('object_collision.png', OBJECT_SIZE)
+
+        # Load terrain images, including the custom water outline image for
+        # better visibility of water edges, and pack them into atlases. Ground
+        # tiles are opaque, so they are converted without per-pixel alpha
+        tile_imgs = [
+            assets.get('grass.png', alpha=False),
+            assets.get('water.png', alpha=False),
+            assets.get('water_outline.png', TILE_SIZE, False)
+        ]
+        grass_variants = [
+            assets.get('grass_a.png', TILE_SIZE, False),
+            assets.get('grass_b.png', TILE_SIZE, False),
+            assets.get('grass_d.png', TILE_SIZE, False)
+        ]
+        self.terrain_tiles = TerrainTiles(TILE_SIZE, tile_imgs, grass_variants,
+                                          [assets.get('tree1.png', TILE_SIZE)])
+        self.terrain_layer = TerrainLayer(self.terrain_tiles)
+        self.chunk_layer = ChunkLayer(self.terrain_tiles)
+        self.profiler = None
+        self.dirty_rects = dirty_rects
+        self.last_sprites = []
+
+    def load_weapon(self, weapon):
+        """
+        Gets the scaled image of a weapon from the asset cache.
+
+        Args:
+            weapon (Weapon): Weapon to draw.
+        """
+        scale = weapon.get_scale()  # Retrieve weapon scale
+        self.weapon = weapon
+        self.weapon_img = self.assets.get(weapon.get_img(), (scale, scale))
+        self.weapon_rect = self.weapon_img.get_rect()
+
+    def camera(self, state, view_size):
+        """
+        Gets the world position shown at the top-left corner of the screen.
+
+        Args:
+            state (GameState): Game being drawn.
+            view_size (tuple): Width and height of the screen.
+
+        Returns:
+            tuple: (x, y) camera position. In infinite mode the view follows
+            the player; otherwise it is fixed at the origin.
+        """
+        if state.chunks is None:
+            return (0, 0)
+        view_w, view_h = view_size
+        return (state.player.x + CHARACTER_SIZE[0] // 2 - view_w // 2,
+                state.player.y + CHARACTER_SIZE[1] // 2 - view_h // 2)
+
+    def visible_areas(self, state, camera, view_size):
+        """
+        Gets the maps with objects and enemies that may be on screen.
+
+        In infinite mode an enemy belongs to the chunk its top-left corner is
+        in, so chunks up to CULL_MARGIN pixels outside the view are included
+        for the sprites that reach into it.
+
+        Args:
+            state (GameState): Game being drawn.
+            camera (tuple): World position of the screen's top-left corner.
+            view_size (tuple): Width and height of the screen.
+
+        Returns:
+            list: The current World, or the chunks in or near the view in
+            infinite mode.
+        """
+        if state.chunks is None:
+            return [state.world]
+        return state.chunks.in_rect(camera[0] - CULL_MARGIN, camera[1] - CULL_MARGIN,
+                                    view_size[0] + 2 * CULL_MARGIN, view_size[1] + 2 * CULL_MARGIN)
+
+    def draw_terrain(self, screen, state, camera):
+        """
+        Draws the terrain, covering the whole screen.
+
+        Args:
+            screen (pygame.Surface): Display surface to draw onto.
+            state (GameState): Game being drawn.
+            camera (tuple): World position of the screen's top-left corner.
+        """
+        if state.chunks is not None:
+            screen.fill((0, 0, 0))
+            self.chunk_layer.draw(screen, state.chunks, camera)
+        else:
+            # Rebuild the cached terrain image when the map or room changed
+            if self.terrain_layer.terrain_grid is not state.world.terrain:
+                self.terrain_layer.set_grid(state.world.terrain)
+            self.terrain_layer.draw(screen)
+
+    def area_sprites(self, area, camera, view_size, now, sprites):
+        """
+        Adds the objects and enemies of a map to a draw list.
+
+        Enemies are culled to those near the view first, so a map crowded
+        with enemies only costs as much as the ones on screen.
+
+        Args:
+            area (World): Map (or chunk) whose contents to draw.
+            camera (tuple): World position of the screen's top-left corner.
+            view_size (tuple): Width and height of the view in pixels.
+            now (int): Shared clock time for this frame, in milliseconds.
+            sprites (list): Draw list to append (image or fill color, rect)
+                pairs to, in drawing order.
+        """
+        # Draw objects, using the collision image if the object has been interacted with
+        for (object_x, object_y), collided in zip(area.object_positions, area.object_collided):
+            object_pos = (object_x - camera[0], object_y - camera[1])
+            if collided:
+                img = self.object_collision_img  # Render collision version of object
+            else:
+                img = self.object_img  # Render regular object
+            sprites.append((img, pygame.Rect(object_pos, img.get_size())))
+
+        # Keep the enemies whose sprite or health bar may overlap the view
+        enemies = area.enemies
+        xs = enemies.positions[:, 0] - camera[0]
+        ys = enemies.positions[:, 1] - camera[1]
+        shown = np.flatnonzero((xs > -CULL_MARGIN) & (xs < view_size[0] + CULL_MARGIN) &
+                               (ys > -CULL_MARGIN) & (ys < view_size[1] + CULL_MARGIN))
+
+        # Draw enemies, replaced with death animation if dead
+        for (enemy_x, enemy_y), hp, max_hp, alive, type_id in zip(enemies.positions[shown].tolist(),
+                                                                  enemies.hp[shown].tolist(),
+                                                                  enemies.max_hp[shown].tolist(),
+                                                                  enemies.alive[shown].tolist(),
+                                                                  enemies.types[shown].tolist()):
+            enemy_pos = (enemy_x - camera[0], enemy_y - camera[1])
+            if not alive:
+                # Cycle through death animation frames at 200ms intervals
+                img = self.death_animation.frame(now)  # Display death animation frame
+                sprites.append((img, pygame.Rect(enemy_pos, img.get_size())))
+            else:
+                # Enemy is alive, draw its sprite
+                img = self.enemy_imgs[type_id]
+                sprites.append((img, pygame.Rect(enemy_pos, img.get_size())))
+
+                # Draw red background for health bar, unless the green portion hides all of it
+                if hp < max_hp:
+                    sprites.append(((200, 0, 0), pygame.Rect(enemy_pos[0] - 10, enemy_pos[1] - 10, 80, 10)))
+
+                # Draw green portion of health bar based on current HP percentage
+                sprites.append(((0, 200, 0),
+                                pygame.Rect(enemy_pos[0] - 10, enemy_pos[1] - 10, 80 * (hp / max_hp), 10)))
+
+    def sprites(self, state, camera, view_size, now):
+        """
+        Builds the draw list of everything drawn on top of the terrain.
+
+        Args:
+            state (GameState): Game being drawn.
+            camera (tuple): World position of the screen's top-left corner.
+            view_size (tuple): Width and height of the screen.
+            now (int): Shared clock time for this frame, in milliseconds.
+
+        Returns:
+            list: (image or fill color, rect) pairs in drawing order.
+        """
+        sprites = []
+        for area in self.visible_areas(state, camera, view_size):
+            self.area_sprites(area, camera, view_size, now, sprites)
+
+        # Character sprite, then the equipped weapon sprite
+        sprites.append((self.character_img, self.character_rect.copy()))
+        sprites.append((self.weapon_img, self.weapon_rect.copy()))
+        return sprites
+
+    @staticmethod
+    def draw_sprite(screen, sprite):
+        """
+        Draws one entry of a draw list.
+
+        Args:
+            screen (pygame.Surface): Display surface to draw onto.
+            sprite (tuple): (image or fill color, rect) pair.
+        """
+        img, rect = sprite
+        if isinstance(img, tuple):
+            screen.fill(img, rect)  # Health bar
+        else:
+            screen.blit(img, rect)
+
+    def draw(self, screen, state, now, overlay=None):
+        """
+        Draws a frame.
+
+        In dirty-rect mode only the parts of the screen whose sprites changed
+        since the previous frame are redrawn: the cached terrain is restored
+        under each changed area and the sprites overlapping it are drawn again,
+        clipped to the area. The whole frame is drawn when there is nothing to
+        compare against (first frame, new map, resize) and in infinite mode,
+        where the view scrolls every frame.
+
+        Args:
+            screen (pygame.Surface): Display surface to draw onto.
+            state (GameState): Game to draw.
+            now (int): Shared clock time for this frame, in milliseconds.
+            overlay (ProfilerOverlay): Overlay drawn on top of the frame, or None.
+
+        Returns:
+            list: Rects of the screen that changed, to pass to
+            pygame.display.update, or None if the whole screen changed.
+        """
+        player = state.player
+        if player.get_tool() is not self.weapon:
+            self.load_weapon(player.get_tool())  # Weapon graphics for the new selection
+
+        view_size = screen.get_size()
+        camera = self.camera(state, view_size)
+
+        # Position the character and weapon sprites
+        self.character_rect.topleft = (player.x - camera[0], player.y - camera[1])
+        self.weapon_rect.topleft = (self.character_rect.x + 30, self.character_rect.y + 15)
+
+        if self.dirty_rects and state.chunks is None:
+            if self.terrain_layer.terrain_grid is not state.world.terrain:
+                self.terrain_layer.set_grid(state.world.terrain)
+            background = self.terrain_layer.surface
+            if background is not None and background.get_size() == view_size:
+                return self.redraw_changed(screen, state, camera, now, overlay)
+
+        # Draw the terrain (also clears the previous frame), then everything on top
+        self.draw_terrain(screen, state, camera)
+        self.lap("terrain")
+        sprites = self.sprites(state, camera, view_size, now)
+        for sprite in sprites:
+            self.draw_sprite(screen, sprite)
+        self.lap("entities")
+        if self.add_overlay(sprites, overlay):
+            self.draw_sprite(screen, sprites[-1])
+        self.last_sprites = sprites
+        self.lap("overlay")
+        return None
+
+    def lap(self, phase):
+        """
+        Charges the time since the last lap to a frame phase, when profiling.
+
+        Args:
+            phase (str): Name of the phase that just finished.
+        """
+        if self.profiler is not None:
+            self.profiler.lap(phase)
+
+    @staticmethod
+    def add_overlay(sprites, overlay):
+        """
+        Adds the overlay, if it is shown, to the end of a draw list.
+
+        Args:
+            sprites (list): Draw list to append to.
+            overlay (ProfilerOverlay): Overlay to add, or None.
+
+        Returns:
+            bool: Whether the overlay was added.
+        """
+        if overlay is None or not overlay.visible:
+            return False
+        sprites.append(overlay.sprite())
+        return True
+
+    def redraw_changed(self, screen, state, camera, now, overlay):
+        """
+        Redraws only the areas of the screen that changed since the last frame.
+
+        Sprites are compared by image (or fill color) and position, so a sprite
+        that moved, changed animation frame or appeared or disappeared marks
+        both its old and new area as changed.
+
+        Args:
+            screen (pygame.Surface): Display surface holding the previous frame.
+            state (GameState): Game to draw.
+            camera (tuple): World position of the screen's top-left corner.
+            now (int): Shared clock time for this frame, in milliseconds.
+            overlay (ProfilerOverlay): Overlay drawn on top of the frame, or None.
+
+        Returns:
+            list: Rects of the screen that were redrawn.
+        """
+        sprites = self.sprites(state, camera, screen.get_size(), now)
+        self.lap("entities")
+        # Index of the overlay in the draw list, if it is shown
+        overlay_index = len(sprites) if self.add_overlay(sprites, overlay) else -1
+        self.lap("overlay")
+        current = {(img, tuple(rect)) for img, rect in sprites}
+        previous = {(img, tuple(rect)) for img, rect in self.last_sprites}
+        self.last_sprites = sprites
+
+        # Merge the changed areas, so overlapping ones are only redrawn once
+        screen_rect = screen.get_rect()
+        dirty = []
+        for _, rect in current ^ previous:
+            rect = screen_rect.clip(rect)
+            if not rect.w or not rect.h:
+                continue
+            index = rect.collidelist(dirty)
+            if index >= 0:
+                dirty[index].union_ip(rect)
+            else:
+                dirty.append(rect)
+        self.lap("dirty")
+
+        # Restore the terrain under each changed area and redraw what overlaps it
+        background = self.terrain_layer.surface
+        rects = [rect for _, rect in sprites]
+        for area in dirty:
+            screen.set_clip(area)
+            screen.blit(background, area, area)
+            self.lap("terrain")
+            hits = area.collidelistall(rects)
+            for index in hits:
+                if index != overlay_index:
+                    self.draw_sprite(screen, sprites[index])
+            self.lap("entities")
+            if overlay_index in hits:
+                self.draw_sprite(screen, sprites[overlay_index])  # Always last, on top
+                self.lap("overlay")
+        screen.set_clip(None)
+        return dirty
+
+class ProfilerOverlay:
+    """
+    On-screen table of frame-time percentiles, toggled on and off in game.
+
+    The text is only re-rendered every few frames, so showing the overlay
+    costs a single blit on most frames.
+
+    Attributes:
+        profiler (FrameProfiler): Profiler whose percentiles are shown
+        refresh_frames (int): Frames between updates of the text
+        visible (bool): Whether the overlay is drawn
+        font (pygame.font.Font): Font of the text
+        surface (pygame.Surface): Rendered table, or None before the first draw
+        rendered_at (int): Profiler frame count when the table was rendered
+    """
+    def __init__(self, profiler, refresh_frames=30):
+        """
+        Initializes a hidden overlay.
+
+        Args:
+            profiler (FrameProfiler): Profiler whose percentiles to show.
+            refresh_frames (int): Frames between updates of the text.
+        """
+        pygame.font.init()
+        self.profiler = profiler
+        self.refresh_frames = refresh_frames
+        self.visible = False
+        self.font = pygame.font.Font(None, 20)
+        self.surface = None
+        self.rendered_at = 0
+
+    def toggle(self):
+        """
+        Shows the overlay if it is hidden, and hides it otherwise.
+        """
+        self.visible = not self.visible
+        self.surface = None  # Show current numbers as soon as it appears
+
+    def render(self):
+        """
+        Renders the percentile table onto a translucent surface.
+
+        Returns:
+            pygame.Surface: The table, one line per phase.
+        """
+        lines = [f"{'phase':<10}{'p50':>8}{'p95':>8}{'p99':>8}  ms"]
+        for name, (p50, p95, p99) in self.profiler.percentiles().items():
+            lines.append(f"{name:<10}{p50:>8.2f}{p95:>8.2f}{p99:>8.2f}")
+        texts = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        line_h = self.font.get_linesize()
+        width = max(text.get_width() for text in texts) + 12
+        surface = pygame.Surface((width, line_h * len(texts) + 12), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        for i, text in enumerate(texts):
+            surface.blit(text, (6, 6 + i * line_h))
+        return surface
+
+    def sprite(self):
+        """
+        Gets the overlay as a draw list entry for the top-left corner.
+
+        Returns:
+            tuple: (image, rect) pair of the current table.
+        """
+        frames = self.profiler.frames
+        if self.surface is None or frames - self.rendered_at >= self.refresh_frames:
+            self.surface = self.render()
+            self.rendered_at = frames
+        return (self.surface, self.surface.get_rect(topleft=(10, 10)))
@@ -0,0 +1,296 @@
+"""
+Input recording and replay for the Procedurally-Generated 2D Role-Playing Game.
+
+A recording holds the world seed and the player's input for every simulated
+tick, one byte per tick, plus the rare events that change the game outside of
+step() (regenerating the map, resizing the window). Because the simulation is
+deterministic, feeding a recording back through a headless GameState
+reproduces the session exactly, at whatever speed the machine allows.
+
+Usage (from the repository root):
+    python Game_Code/main.py --record session.rpgr
+    python Game_Code/replay.py session.rpgr --hashes session.hashes
+    python Game_Code/replay.py session.rpgr --check session.hashes
+"""
+import hashlib
+import struct
+import time
+
+from engine import GameState, Inputs
+
+MAGIC = b"RPGR"  # Identifies recording files
+VERSION = 3  # Format version, bumped on incompatible changes
+MODES = ("single", "rooms", "infinite")  # Game modes, stored by index
+
+# Header: magic, version, mode, seed, view width, view height, tick count
+HEADER = struct.Struct("<4sBBqHHI")
+# Event: tick it happens before, kind, two values
+EVENT = struct.Struct("<IBqq")
+
+REGENERATE = 1  # New map; values: seed, unused
+RESIZE = 2  # New view size; values: width, height
+
+# Bits of an input byte (the top three bits hold the weapon slot plus one)
+LEFT, RIGHT, UP, DOWN, ATTACK = 1, 2, 4, 8, 16
+WEAPON_SHIFT = 5
+
+
+def pack_inputs(inputs):
+    """
+    Packs one tick of input into a byte.
+
+    Args:
+        inputs (Inputs): Input to pack.
+
+    Returns:
+        int: Bit mask of the held keys, with the selected weapon slot plus one
+        (or 0 for none) in the top three bits.
+    """
+    bits = ((LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0) |
+            (UP if inputs.up else 0) | (DOWN if inputs.down else 0) |
+            (ATTACK if inputs.attack else 0))
+    if inputs.weapon is not None:
+        bits |= (inputs.weapon + 1) << WEAPON_SHIFT
+    return bits
+
+
+def unpack_inputs(bits):
+    """
+    Unpacks a byte written by pack_inputs.
+
+    Args:
+        bits (int): Packed input byte.
+
+    Returns:
+        Inputs: The input it holds.
+    """
+    weapon = bits >> WEAPON_SHIFT
+    return Inputs(left=bool(bits & LEFT), right=bool(bits & RIGHT),
+                  up=bool(bits & UP), down=bool(bits & DOWN),
+                  attack=bool(bits & ATTACK),
+                  weapon=weapon - 1 if weapon else None)
+
+
+class Recording:
+    """
+    A recorded session: how the game started and the input of every tick.
+
+    Attributes:
+        seed (int): World seed the session started with
+        mode (str): Game mode ("single", "rooms" or "infinite")
+        view_size (tuple): Width and height of the view at the start
+        ticks (bytearray): Packed input of every tick, in order
+        events (list): (tick, kind, a, b) events, in the order they happened
+    """
+    def __init__(self, seed, mode, view_size):
+        """
+        Starts an empty recording.
+
+        Args:
+            seed (int): World seed the session starts with.
+            mode (str): Game mode ("single", "rooms" or "infinite").
+            view_size (tuple): Width and height of the view.
+        """
+        self.seed = seed
+        self.mode = mode
+        self.view_size = tuple(view_size)
+        self.ticks = bytearray()
+        self.events = []
+
+    def record(self, inputs):
+        """
+        Records the input of the next tick.
+
+        Args:
+            inputs (Inputs): Input the tick is simulated with.
+        """
+        self.ticks.append(pack_inputs(inputs))
+
+    def regenerate(self, seed):
+        """
+        Records that the map is replaced before the next tick.
+
+        Args:
+            seed (int): Seed of the new map.
+        """
+        self.events.append((len(self.ticks), REGENERATE, seed, 0))
+
+    def resize(self, view_size):
+        """
+        Records that the view is resized before the next tick.
+
+        Args:
+            view_size (tuple): New width and height of the view.
+        """
+        self.events.append((len(self.ticks), RESIZE, view_size[0], view_size[1]))
+
+    def save(self, path):
+        """
+        Writes the recording to a file.
+
+        Args:
+            path (str): File to write.
+        """
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, MODES.index(self.mode), self.seed,
+                                   self.view_size[0], self.view_size[1], len(self.ticks)))
+            file.write(self.ticks)
+            file.write(struct.pack("<I", len(self.events)))
+            for event in self.events:
+                file.write(EVENT.pack(*event))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a recording written by save().
+
+        Args:
+            path (str): File to read.
+
+        Returns:
+            Recording: The recorded session.
+
+        Raises:
+            ValueError: If the file is not a recording of a supported version
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, mode, seed, view_w, view_h, tick_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} recording")
+        recording = cls(seed, MODES[mode], (view_w, view_h))
+        offset = HEADER.size
+        recording.ticks = bytearray(data[offset:offset + tick_count])
+        offset += tick_count
+        (event_count,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        recording.events = [EVENT.unpack_from(data, offset + i * EVENT.size)
+                            for i in range(event_count)]
+        return recording
+
+
+def state_hash(state):
+    """
+    Computes a short fingerprint of everything step() can change.
+
+    Covers the player, weapon cooldown, current room and the objects and
+    enemies of every loaded map, so two runs that diverge in any of them get
+    different hashes. In infinite mode only the chunks around the player are
+    covered, since which other chunks are loaded depends on what was drawn.
+
+    Args:
+        state (GameState): Game to fingerprint.
+
+    Returns:
+        str: 16 hex digit hash.
+    """
+    player = state.player
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(struct.pack("<qddiiq??", state.seed, player.x, player.y,
+                              player.get_inventory().index(player.get_tool()),
+                              state.timer, state.tick, state.cooldown, state.forward))
+    if state.chunks is not None:
+        # Look the chunks up without generating them or changing their LRU order
+        cx, cy = state.chunks.chunk_at(player.x, player.y)
+        areas = [state.chunks.chunks[(cx + i, cy + j)]
+                 for j in (-1, 0, 1) for i in (-1, 0, 1)
+                 if (cx + i, cy + j) in state.chunks.chunks]
+    elif state.rooms is not None:
+        current = state.rooms.current
+        digest.update(struct.pack("<ii", current.rx, current.ry))
+        areas = [room.world for room in state.rooms.rooms.values()]
+    else:
+        areas = [state.world]
+    for area in areas:
+        digest.update(bytes(area.object_collided))
+        enemies = area.enemies
+        digest.update(enemies.ids.tobytes())
+        digest.update(enemies.hp.tobytes())
+        digest.update(enemies.positions.tobytes())
+    return digest.hexdigest()
+
+
+def replay(recording, on_tick=None):
+    """
+    Runs a recording through a headless game as fast as possible.
+
+    Args:
+        recording (Recording): Session to replay.
+        on_tick (callable): Called with the state after every tick, or None.
+
+    Returns:
+        GameState: The game after the last tick. Its room worker threads are
+        already stopped.
+    """
+    state = GameState(recording.seed, recording.view_size,
+                      infinite=recording.mode == "infinite",
+                      rooms=recording.mode == "rooms")
+    events = recording.events
+    next_event = 0
+    try:
+        for tick, bits in enumerate(recording.ticks):
+            # Apply the events that happened before this tick
+            while next_event < len(events) and events[next_event][0] <= tick:
+                _, kind, a, b = events[next_event]
+                if kind == REGENERATE:
+                    state.regenerate(a)
+                elif kind == RESIZE:
+                    state.view_size = (a, b)
+                next_event += 1
+            state.step(unpack_inputs(bits))
+            if on_tick is not None:
+                on_tick(state)
+    finally:
+        state.close()
+    return state
+
+
+def main(argv=None):
+    """
+    Replays a recording and reports or checks its per-tick state hashes.
+
+    Args:
+        argv (list): Command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit status: 1 if --check found a divergence, otherwise 0.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a recorded session headless")
+    parser.add_argument("recording", help="file written by main.py --record")
+    parser.add_argument("--hashes", metavar="FILE",
+                        help="write the state hash after every tick to FILE")
+    parser.add_argument("--check", metavar="FILE",
+                        help="compare the state hashes against a file written by --hashes")
+    args = parser.parse_args(argv)
+
+    recording = Recording.load(args.recording)
+    hashes = []
+    start = time.perf_counter()
+    state = replay(recording, lambda state: hashes.append(state_hash(state)))
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {len(recording.ticks)} ticks in {elapsed:.3f}s "
+          f"({len(recording.ticks) / max(elapsed, 1e-9):.0f} ticks/s), "
+          f"final state {state_hash(state)}")
+
+    if args.hashes:
+        with open(args.hashes, "w") as file:
+            file.write("\n".join(hashes) + "\n")
+    if args.check:
+        with open(args.check) as file:
+            expected = file.read().split()
+        for tick, (got, want) in enumerate(zip(hashes, expected)):
+            if got != want:
+                print(f"Diverged at tick {tick}: {got} != {want}")
+                return 1
+        if len(hashes) != len(expected):
+            print(f"Replayed {len(hashes)} ticks, expected {len(expected)}")
+            return 1
+        print("All tick hashes match")
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Room graph for the Procedurally-Generated 2D Role-Playing Game.
+
+Walking out through the middle of a screen edge leads to the neighbouring
+room. Rooms that have been visited stay in memory with their state (opened
+chests, damaged enemies), and the rooms next to the player are generated on
+a background thread before they are entered.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from generation import GRASS, OUTLINE, add_outlines, generate_world, stream
+
+# Room coordinate offset for each exit direction
+DIRECTIONS = {
+    "w": (-1, 0),
+    "n": (0, -1),
+    "s": (0, 1),
+    "e": (1, 0),
+}
+
+# Direction of the exit a player arrives through after leaving in a direction
+OPPOSITE = {"w": "e", "n": "s", "s": "n", "e": "w"}
+
+
+def clear_exits(terrain_grid, depth=3, half_width=2):
+    """
+    Removes water in front of the exits in the middle of each map edge.
+
+    This keeps the player from arriving in (or being walled off from) an
+    exit by water.
+
+    Args:
+        terrain_grid (numpy.ndarray): Grid of terrain kinds, modified in place.
+        depth (int): How many tiles in from the edge are cleared.
+        half_width (int): How many tiles on each side of the edge's middle are
+            cleared.
+    """
+    rows, cols = terrain_grid.shape
+    mid_row, mid_col = rows // 2, cols // 2
+    band_rows = slice(max(0, mid_row - half_width), mid_row + half_width + 1)
+    band_cols = slice(max(0, mid_col - half_width), mid_col + half_width + 1)
+    terrain_grid[band_rows, :depth] = GRASS  # West exit
+    terrain_grid[band_rows, cols - depth:] = GRASS  # East exit
+    terrain_grid[:depth, band_cols] = GRASS  # North exit
+    terrain_grid[rows - depth:, band_cols] = GRASS  # South exit
+
+    # Redo the outlines, since some of the water they bordered is gone
+    terrain_grid[terrain_grid == OUTLINE] = GRASS
+    add_outlines(terrain_grid)
+
+
+def build_room_world(seed, lakes):
+    """
+    Generates the map of a room, with its exits cleared.
+
+    Args:
+        seed (int): Seed of the room's map.
+        lakes (bool): Generate lakes and pools instead of square clusters.
+
+    Returns:
+        World: The room's map.
+    """
+    world = generate_world(seed, lakes)
+    clear_exits(world.terrain)
+    return world
+
+
+class Room:
+    """
+    A map in the room graph, linked to the rooms next to it.
+
+    Attributes:
+        rx (int): Room column in the graph
+        ry (int): Room row in the graph
+        world (World): The room's map and its current state
+        w_neighbor (Room): Room to the west, once it has been generated
+        n_neighbor (Room): Room to the north, once it has been generated
+        s_neighbor (Room): Room to the south, once it has been generated
+        e_neighbor (Room): Room to the east, once it has been generated
+    """
+    def __init__(self, rx, ry, world):
+        """
+        Initializes a room with no linked neighbours.
+
+        Args:
+            rx (int): Room column in the graph.
+            ry (int): Room row in the graph.
+            world (World): The room's map.
+        """
+        self.rx = rx
+        self.ry = ry
+        self.world = world
+        self.w_neighbor = None
+        self.n_neighbor = None
+        self.s_neighbor = None
+        self.e_neighbor = None
+
+
+class RoomGraph:
+    """
+    All rooms of one world, generated from a single world seed.
+
+    Room (0, 0) is the map generated from the world seed itself; every other
+    room gets a seed derived from the world seed and its coordinates, so the
+    same world seed always leads to the same rooms. Rooms adjacent to the
+    player can be prefetched on a worker thread, and moving to a room only
+    swaps which room is current.
+
+    Attributes:
+        seed (int): World seed
+        rooms (dict): Visited and generated rooms by (rx, ry)
+        pending (dict): Futures of rooms being generated in the background
+        current (Room): Room the player is in
+        executor (ThreadPoolExecutor): Worker thread for prefetching
+    """
+    def __init__(self, seed, origin=None):
+        """
+        Creates the graph with the player in room (0, 0).
+
+        Args:
+            seed (int): World seed.
+            origin (World): Already generated map for room (0, 0), or None to
+                generate it from the seed.
+        """
+        self.seed = seed
+        self.rooms = {}
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rooms")
+        if origin is None:
+            origin = generate_world(seed)
+        clear_exits(origin.terrain)
+        self.current = self.add_room(0, 0, origin)
+
+    def room_seed(self, rx, ry):
+        """
+        Gets the map seed of a room.
+
+        Args:
+            rx (int): Room column.
+            ry (int): Room row.
+
+        Returns:
+            int: The world seed for room (0, 0), otherwise a short seed derived
+            from the world seed and the room coordinates.
+        """
+        if (rx, ry) == (0, 0):
+            return self.seed
+        return stream(self.seed, "room", rx, ry).randrange(100000)
+
+    def add_room(self, rx, ry, world):
+        """
+        Adds a generated room to the graph and links it to its neighbours.
+
+        Args:
+            rx (int): Room column.
+            ry (int): Room row.
+            world (World): The room's map.
+
+        Returns:
+            Room: The new room.
+        """
+        room = Room(rx, ry, world)
+        self.rooms[(rx, ry)] = room
+        for direction, (dx, dy) in DIRECTIONS.items():
+            neighbor = self.rooms.get((rx + dx, ry + dy))
+            if neighbor is not None:
+                setattr(room, f"{direction}_neighbor", neighbor)
+                setattr(neighbor, f"{OPPOSITE[direction]}_neighbor", room)
+        return room
+
+    def get(self, rx, ry):
+        """
+        Gets a room, generating it if needed.
+
+        Uses the prefetched map if one is ready or in progress.
+
+        Args:
+            rx (int): Room column.
+            ry (int): Room row.
+
+        Returns:
+            Room: The room at those coordinates.
+        """
+        room = self.rooms.get((rx, ry))
+        if room is None:
+            future = self.pending.pop((rx, ry), None)
+            if future is not None:
+                world = future.result()
+            else:
+                world = build_room_world(self.room_seed(rx, ry), True)
+            room = self.add_room(rx, ry, world)
+        return room
+
+    def prefetch(self, direction):
+        """
+        Starts generating the room next to the current one in the background.
+
+        Does nothing if that room already exists or is being generated.
+
+        Args:
+            direction (str): Exit direction ("w", "n", "s" or "e").
+        """
+        dx, dy = DIRECTIONS[direction]
+        key = (self.current.rx + dx, self.current.ry + dy)
+        if key not in self.rooms and key not in self.pending:
+            self.pending[key] = self.executor.submit(build_room_world,
+                                                     self.room_seed(*key), True)
+
+    def move(self, direction):
+        """
+        Makes the room next to the current one the current room.
+
+        Args:
+            direction (str): Exit direction ("w", "n", "s" or "e").
+
+        Returns:
+            Room: The new current room.
+        """
+        dx, dy = DIRECTIONS[direction]
+        self.current = self.get(self.current.rx + dx, self.current.ry + dy)
+        return self.current
+
+    def close(self):
+        """
+        Stops the prefetching worker thread.
+        """
+        # Cancel the queued rooms by hand: shutdown(cancel_futures=True) needs Python 3.9
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,218 @@
+"""
+Saving and loading games for the Procedurally-Generated 2D Role-Playing Game.
+
+Every map is generated from a seed, so a save only stores the seed and what
+the player changed since: which chests were opened, which enemies were
+defeated, damaged or moved, which enemies walked in from other chunks, and
+where the player is. Loading regenerates the maps
+from the seed and applies those changes. Everything is written as packed
+little-endian arrays, a few bytes per changed object or enemy.
+"""
+import struct
+
+import numpy as np
+
+from engine import GameState
+from chunks import generate_chunk
+from generation import ENEMY_HP, generate_world
+
+MAGIC = b"RPGS"  # Identifies save files
+VERSION = 4  # Format version, bumped on incompatible changes
+MODES = ("single", "rooms", "infinite")  # Game modes, stored by index
+
+# Header: magic, version, mode, lakes, seed, player x, player y, player HP,
+# equipped inventory slot, current room column and row, number of areas
+HEADER = struct.Struct("<4sBBBqdddBiiI")
+# Area: column and row (room or chunk coordinates), opened chests, defeated
+# enemies, damaged enemies, moved enemies and enemies arrived from other chunks
+AREA = struct.Struct("<iiHHHHH")
+
+
+def area_keys(state):
+    """
+    Gets every map of a game that may hold changes, by its coordinates.
+
+    Args:
+        state (GameState): Game to look at.
+
+    Returns:
+        list: ((column, row), World) pairs: the visited rooms in room mode,
+        the loaded chunks in infinite mode, or the only map at (0, 0).
+    """
+    if state.rooms is not None:
+        return [(key, room.world) for key, room in state.rooms.rooms.items()]
+    if state.chunks is not None:
+        return list(state.chunks.chunks.items())
+    return [((0, 0), state.world)]
+
+
+def generated_enemies(state, key, area):
+    """
+    Regenerates the enemies of a map as they were before the game changed them.
+
+    Args:
+        state (GameState): Game the map belongs to.
+        key (tuple): (column, row) coordinates of the map.
+        area (World): The map.
+
+    Returns:
+        EnemyStore: The map's enemies as generated.
+    """
+    if state.chunks is not None:
+        return generate_chunk(state.seed, key[0], key[1], state.chunks.size).enemies
+    # Enemies are placed around the terrain and objects, so regenerate the whole map
+    return generate_world(area.seed, area.lakes).enemies
+
+
+def pack_area(key, area, generated):
+    """
+    Packs what changed on a map since it was generated.
+
+    Chests start closed and enemies start with full health, with ids counting
+    up from 0, so only the enemy positions need the generated enemies to
+    compare against. Enemies with later ids walked in from another chunk and
+    are stored whole; an enemy that walked out counts as defeated here.
+
+    Args:
+        key (tuple): (column, row) coordinates of the map.
+        area (World): The map.
+        generated (EnemyStore): The map's enemies as generated.
+
+    Returns:
+        bytes: The packed changes, or empty bytes if nothing changed.
+    """
+    opened = np.flatnonzero(area.object_collided).astype("<u2")
+    enemies = area.enemies
+    native = enemies.alive & (enemies.ids < len(generated))
+    # Generated enemies no longer in the store, or dying, count as defeated
+    defeated = np.setdiff1d(np.arange(len(generated)), enemies.ids[native]).astype("<i4")
+    damaged = native & (enemies.hp != enemies.max_hp)
+    damaged_ids = enemies.ids[damaged].astype("<i4")
+    damaged_hp = enemies.hp[damaged].astype("<f8")
+    # Generated enemies are stored in id order, so ids index their positions
+    moved = native.copy()
+    moved[native] = (enemies.positions[native] != generated.positions[enemies.ids[native]]).any(axis=1)
+    moved_ids = enemies.ids[moved].astype("<i4")
+    moved_positions = enemies.positions[moved].astype("<f8")
+    arrived = enemies.alive & ~native
+    arrived_positions = enemies.positions[arrived].astype("<f8")
+    arrived_hp = enemies.hp[arrived].astype("<f8")
+    arrived_types = enemies.types[arrived].astype("u1")
+    if (not len(opened) and not len(defeated) and not len(damaged_ids) and not len(moved_ids)
+            and not len(arrived_hp)):
+        return b""
+    return b"".join((AREA.pack(key[0], key[1], len(opened), len(defeated), len(damaged_ids),
+                               len(moved_ids), len(arrived_hp)),
+                     opened.tobytes(), defeated.tobytes(),
+                     damaged_ids.tobytes(), damaged_hp.tobytes(),
+                     moved_ids.tobytes(), moved_positions.tobytes(),
+                     arrived_positions.tobytes(), arrived_hp.tobytes(), arrived_types.tobytes()))
+
+
+def save_game(state, path):
+    """
+    Writes a game to a save file.
+
+    Args:
+        state (GameState): Game to save.
+        path (str): File to write.
+    """
+    if state.chunks is not None:
+        mode, lakes = "infinite", True
+    elif state.rooms is not None:
+        mode, lakes = "rooms", state.rooms.rooms[(0, 0)].world.lakes
+    else:
+        mode, lakes = "single", state.world.lakes
+    room = (state.rooms.current.rx, state.rooms.current.ry) if state.rooms is not None else (0, 0)
+    player = state.player
+
+    areas = [pack_area(key, area, generated_enemies(state, key, area))
+             for key, area in area_keys(state)]
+    areas = [area for area in areas if area]
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, MODES.index(mode), lakes, state.seed,
+                               player.x, player.y, player.HP,
+                               player.get_inventory().index(player.get_tool()),
+                               room[0], room[1], len(areas)))
+        file.write(b"".join(areas))
+
+
+def load_game(path, view_size=(1000, 700)):
+    """
+    Rebuilds a game from a save file.
+
+    Args:
+        path (str): File written by save_game.
+        view_size (tuple): Width and height of the view, in pixels.
+
+    Returns:
+        GameState: The saved game.
+
+    Raises:
+        ValueError: If the file is not a save of a supported version
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    (magic, version, mode, lakes, seed, player_x, player_y, player_hp, tool,
+     room_x, room_y, area_count) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} save")
+    mode = MODES[mode]
+
+    # Regenerate the maps from the seed
+    state = GameState(seed, view_size, infinite=mode == "infinite", rooms=mode == "rooms")
+    if mode != "infinite" and lakes:
+        state.set_world(generate_world(seed, lakes=True))  # A map made with Enter
+    if mode == "rooms":
+        state.rooms.current = state.rooms.get(room_x, room_y)
+        state.world = state.rooms.current.world
+
+    # Then apply the changes to each map
+    offset = HEADER.size
+    for _ in range(area_count):
+        (col, row, opened_count, defeated_count, damaged_count,
+         moved_count, arrived_count) = AREA.unpack_from(data, offset)
+        offset += AREA.size
+        opened = np.frombuffer(data, "<u2", opened_count, offset)
+        offset += opened.nbytes
+        defeated = np.frombuffer(data, "<i4", defeated_count, offset)
+        offset += defeated.nbytes
+        damaged_ids = np.frombuffer(data, "<i4", damaged_count, offset)
+        offset += damaged_ids.nbytes
+        damaged_hp = np.frombuffer(data, "<f8", damaged_count, offset)
+        offset += damaged_hp.nbytes
+        moved_ids = np.frombuffer(data, "<i4", moved_count, offset)
+        offset += moved_ids.nbytes
+        moved_positions = np.frombuffer(data, "<f8", moved_count * 2, offset).reshape(-1, 2)
+        offset += moved_positions.nbytes
+        arrived_positions = np.frombuffer(data, "<f8", arrived_count * 2, offset).reshape(-1, 2)
+        offset += arrived_positions.nbytes
+        arrived_hp = np.frombuffer(data, "<f8", arrived_count, offset)
+        offset += arrived_hp.nbytes
+        arrived_types = np.frombuffer(data, "u1", arrived_count, offset)
+        offset += arrived_types.nbytes
+
+        if mode == "rooms":
+            area = state.rooms.get(col, row).world
+        elif mode == "infinite":
+            area = state.chunks.get(col, row)
+        else:
+            area = state.world
+        for index in opened.tolist():
+            area.object_collided[index] = True
+        enemies = area.enemies
+        enemies.select(~np.isin(enemies.ids, defeated))
+        for enemy_id, hp in zip(damaged_ids.tolist(), damaged_hp.tolist()):
+            enemies.hp[enemies.ids == enemy_id] = hp
+        enemies.place(enemies.rows_by_id[moved_ids], moved_positions)
+        # Enemies that walked in from other chunks follow, in the order they arrived
+        start = len(enemies)
+        enemies.spawn(arrived_positions, ENEMY_HP)
+        enemies.hp[start:] = arrived_hp
+        enemies.types[start:] = arrived_types
+
+    player = state.player
+    player.x, player.y = player_x, player_y
+    player.HP = player_hp
+    player.set_tool(tool)
+    return state
@@ -0,0 +1,105 @@
+"""
+Level-of-detail update scheduling for the Procedurally-Generated 2D Role-Playing Game.
+
+Enemies on screen or close to the player are updated every tick. Enemies
+further away are updated every few ticks and catch up on the time they
+skipped, and no more than a fixed number of enemies is updated in a single
+tick, so the cost of enemy logic stays bounded in large, streamed worlds.
+"""
+import numpy as np
+
+LOD_PERIODS = (1, 4, 16)  # Ticks between updates for each level of detail
+LOD_DISTANCES = (600, 1200)  # Pixels from the player where each level after the first starts
+MAX_UPDATES_PER_TICK = 512  # Most enemies updated in a single tick
+
+
+class UpdateScheduler:
+    """
+    Picks which enemies to update in each tick.
+
+    Every enemy gets a level of detail from its distance to the player and
+    whether it is on screen, and each level has an update period. Enemies of
+    the same level are spread over the ticks of the period by their id, so
+    distant enemies do not all update on the same tick. An enemy that is due
+    but does not fit in the budget stays due, and is served first on the next
+    tick along with the rest of its level.
+
+    Attributes:
+        periods (numpy.ndarray): Ticks between updates for each level
+        distances (numpy.ndarray): Distance where each level after the first
+            starts, in pixels
+        budget (int): Most enemies updated in a single tick
+        updated (int): Enemies updated in the last tick
+        deferred (int): Due enemies left for a later tick in the last tick
+    """
+    def __init__(self, periods=LOD_PERIODS, distances=LOD_DISTANCES,
+                 budget=MAX_UPDATES_PER_TICK):
+        """
+        Initializes the scheduler.
+
+        Args:
+            periods (tuple): Ticks between updates for each level of detail,
+                nearest first.
+            distances (tuple): Distance in pixels where each level after the
+                first starts.
+            budget (int): Most enemies to update in a single tick.
+        """
+        self.periods = np.asarray(periods)
+        self.distances = np.asarray(distances)
+        self.budget = budget
+        self.updated = 0
+        self.deferred = 0
+
+    def levels(self, centers, focus, view_rect):
+        """
+        Gets the level of detail of a batch of enemies.
+
+        Args:
+            centers (numpy.ndarray): (N, 2) enemy center positions.
+            focus (tuple): (x, y) position of the player's center.
+            view_rect (tuple): (x, y, width, height) part of the world on screen.
+
+        Returns:
+            numpy.ndarray: Level of each enemy, 0 being the most detailed.
+        """
+        offsets = centers - np.asarray(focus)
+        levels = np.searchsorted(self.distances, np.hypot(offsets[:, 0], offsets[:, 1]))
+        view_x, view_y, view_w, view_h = view_rect
+        on_screen = ((centers[:, 0] >= view_x) & (centers[:, 0] < view_x + view_w) &
+                     (centers[:, 1] >= view_y) & (centers[:, 1] < view_y + view_h))
+        levels[on_screen] = 0
+        return levels
+
+    def plan(self, tick, groups):
+        """
+        Chooses the enemies to update this tick.
+
+        Args:
+            tick (int): Current tick.
+            groups (list): (ids, levels, idle_ticks) arrays for each batch of
+                enemies, idle_ticks counting the ticks since each enemy's last
+                update.
+
+        Returns:
+            list: Array of the chosen positions within each group.
+        """
+        due_groups = []
+        for ids, levels, idle_ticks in groups:
+            periods = self.periods[levels]
+            # On its staggered tick, or overdue after being left out before
+            due = ((tick + ids) % periods == 0) | (idle_ticks >= periods)
+            due_groups.append(np.flatnonzero(due))
+
+        total = sum(len(due) for due in due_groups)
+        self.deferred = max(0, total - self.budget)
+        self.updated = total - self.deferred
+        if not self.deferred:
+            return due_groups
+
+        # Over budget: nearest levels first, then those waiting the longest
+        group_index = np.concatenate([np.full(len(due), i) for i, due in enumerate(due_groups)])
+        positions = np.concatenate(due_groups)
+        levels = np.concatenate([groups[i][1][due] for i, due in enumerate(due_groups)])
+        idle = np.concatenate([groups[i][2][due] for i, due in enumerate(due_groups)])
+        chosen = np.lexsort((-idle, levels))[:self.budget]
+        return [positions[chosen[group_index[chosen] == i]] for i in range(len(groups))]
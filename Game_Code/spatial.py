@@ -0,0 +1,121 @@
+"""
+Spatial hashing for the Procedurally-Generated 2D Role-Playing Game.
+
+Objects and enemies are bucketed by the grid cell their top-left corner lies
+in, so overlap and range checks (chest pickup, enemy contact, weapon reach)
+only look at the few buckets around the area being checked instead of at
+every object or enemy on the map.
+"""
+import numpy as np
+
+CELL_SIZE = 128  # Width and height of a bucket in pixels, larger than any weapon's reach
+
+
+class SpatialHash:
+    """
+    A uniform grid of buckets holding keys by position.
+
+    Only non-empty buckets are stored, in a dictionary keyed by cell
+    coordinates, so the grid has no bounds and costs nothing where there is
+    nothing. The owner of the keys remembers each key's cell and tells the
+    hash when it changes; keys that move within their cell cost nothing.
+
+    Attributes:
+        cell_size (int): Width and height of a bucket in pixels
+        buckets (dict): Set of keys in each non-empty (column, row) cell
+    """
+    def __init__(self, cell_size=CELL_SIZE):
+        """
+        Initializes an empty hash.
+
+        Args:
+            cell_size (int): Width and height of a bucket in pixels.
+        """
+        self.cell_size = cell_size
+        self.buckets = {}
+
+    def cells(self, xs, ys):
+        """
+        Gets the cells a batch of points lies in.
+
+        Args:
+            xs (numpy.ndarray): x-coordinates of the points.
+            ys (numpy.ndarray): y-coordinates of the points.
+
+        Returns:
+            numpy.ndarray: (N, 2) int64 array of (column, row) cells.
+        """
+        return np.column_stack((np.floor_divide(xs, self.cell_size),
+                                np.floor_divide(ys, self.cell_size))).astype(np.int64)
+
+    def add(self, key, cell):
+        """
+        Puts a key in a cell's bucket.
+
+        Args:
+            key (int): Key to add.
+            cell (tuple): (column, row) cell.
+        """
+        bucket = self.buckets.get(cell)
+        if bucket is None:
+            bucket = self.buckets[cell] = set()
+        bucket.add(key)
+
+    def remove(self, key, cell):
+        """
+        Takes a key out of a cell's bucket.
+
+        Args:
+            key (int): Key to remove.
+            cell (tuple): (column, row) cell the key was added to.
+        """
+        bucket = self.buckets[cell]
+        bucket.discard(key)
+        if not bucket:
+            del self.buckets[cell]
+
+    def move(self, key, old_cell, new_cell):
+        """
+        Moves a key to another cell's bucket.
+
+        Args:
+            key (int): Key to move.
+            old_cell (tuple): (column, row) cell the key is in.
+            new_cell (tuple): (column, row) cell the key moves to.
+        """
+        if old_cell != new_cell:
+            self.remove(key, old_cell)
+            self.add(key, new_cell)
+
+    def query(self, x, y, width, height):
+        """
+        Gets the keys whose point may lie in a rectangle.
+
+        Every key in a bucket overlapping the rectangle is returned, so the
+        caller still has to check the exact positions.
+
+        Args:
+            x (float): Left edge of the rectangle.
+            y (float): Top edge of the rectangle.
+            width (float): Width of the rectangle.
+            height (float): Height of the rectangle.
+
+        Returns:
+            list: Candidate keys, in no particular order.
+        """
+        first_col, first_row = int(x // self.cell_size), int(y // self.cell_size)
+        last_col = int((x + width) // self.cell_size)
+        last_row = int((y + height) // self.cell_size)
+        keys = []
+        # Visit whichever is smaller: the cells of the rectangle, or the non-empty buckets
+        if (last_col - first_col + 1) * (last_row - first_row + 1) <= len(self.buckets):
+            for col in range(first_col, last_col + 1):
+                for row in range(first_row, last_row + 1):
+                    bucket = self.buckets.get((col, row))
+                    if bucket:
+                        keys.extend(bucket)
+        else:
+            for (col, row), bucket in self.buckets.items():
+                if first_col <= col <= last_col and first_row <= row <= last_row:
+                    keys.extend(bucket)
+        return keys
@@ -0,0 +1,121 @@
+"""
+Weapons of the Procedurally-Generated 2D Role-Playing Game.
+
+Defines the Weapon class and the set of weapons the player starts with.
+"""
+
+
+class Weapon:
+    """
+    Represents a weapon that can be equipped and used by the player for combat.
+
+    A weapon has properties like damage, cooldown time, and attack range that affect
+    how it performs in combat. Each weapon also has an associated image and scale
+    for rendering purposes.
+
+    Attributes:
+        name: The name/type of the weapon
+        damage: Amount of damage dealt to enemies per hit
+        cooldown: Time delay between attacks in frames
+        reach: Maximum distance the weapon can hit enemies from
+        img: File path to the weapon's sprite image
+        scale: Size multiplier for rendering the weapon sprite
+    """
+    def __init__(self, name, damage, cooldown, reach, img, scale):
+        """
+        Holds information for the weapons in the game.
+
+        Args:
+            name (string): Name of the weapon.
+            damage (int): How much damage the weapon deals to enemies.
+            cooldown (int): Amount of time before the
+            weapon can be swung again.
+            reach (int): How far the player can be to attack the enemy.
+            img (string): The image of the weapon.
+            scale (int): How to scale the weapon to the player model.
+        """
+        self.name = name
+        self.damage = damage
+        self.cooldown = cooldown
+        self.reach = reach
+        self.img = img
+        self.scale = scale
+
+    def get_damage(self):
+        """
+        Gets the weapon's damage stat.
+
+        Returns:
+            int: Damage value.
+        """
+        return self.damage
+    
+    def get_cooldown(self):
+        """
+        Gets the weapon's cooldown duration.
+
+        Returns:
+            int: Cooldown time.
+        """
+        return self.cooldown
+    
+    def get_range(self):
+        """
+        Gets the weapon's attack range.
+
+        Returns:
+            int: Range value.
+        """
+        return self.reach
+    
+    def get_img(self):
+        """
+        Gets the file path of the weapon image.
+
+        Returns:
+            str: Image file path.
+        """
+        return self.img
+    
+    def get_scale(self):
+        """
+        Gets the scaling factor of the weapon.
+
+        Returns:
+            int: Scale factor.
+        """
+        return self.scale
+
+
+def make_weapons():
+    """
+    Creates the weapons the player starts with.
+
+    Each weapon is defined with specific attributes:
+        - Name - String identifier of the weapon type
+        - Damage - Integer value representing hit points of damage dealt
+        - Cooldown - Integer ticks between allowed attacks (60 per second)
+        - Range - Integer pixels for attack reach from player position
+        - Image - String file path for weapon sprite
+        - Scale - Integer size multiplier for sprite rendering
+
+    Returns:
+        list: Sword, mace, spear and knife, in inventory order.
+    """
+    # Balanced starting weapon: Medium damage, speed and range
+    # name="Sword", damage=1, cooldown=25 frames, range=60 pixels
+    sword = Weapon("Sword", 1, 25, 60, 'sword.png', 50)
+
+    # Heavy weapon: High damage but slow attack speed and short range
+    # name="Mace", damage=3, cooldown=60 frames, range=25 pixels
+    mace = Weapon("Mace", 3, 60, 25, 'mace.png', 50)
+
+    # Long-range weapon: Moderate damage and attack speed with extended reach
+    # name="Spear", damage=2, cooldown=40 frames, range=100 pixels
+    spear = Weapon("Spear", 2, 40, 100, 'spear.png', 60)
+
+    # Quick weapon: Fast attack speed but low damage
+    # name="Knife", damage=0.75, cooldown=17 frames, range=50 pixels
+    knife = Weapon("Knife", .75, 17, 50, 'knife.png', 50)
+
+    return [sword, mace, spear, knife]
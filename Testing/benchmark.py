@@ -0,0 +1,441 @@
+"""
+Performance benchmarks for the Procedurally-Generated 2D Role-Playing Game.
+
+Times terrain generation (cluster and lake paths), the water collision check,
+full-frame rendering, terrain rebuilds, attack resolution, broad-phase queries
+enemy movement and stress-mode frames over a fixed set of seeds and several
+map, view and enemy sizes. Results can be saved as a JSON baseline
+and later runs compared against it to catch regressions.
+
+Usage (from the repository root):
+    python Testing/benchmark.py --out baseline.json
+    python Testing/benchmark.py --baseline baseline.json --tolerance 0.2
+    python Testing/benchmark.py --replay session.rpgr  # Also time a recorded session
+
+Rendering uses SDL's dummy video driver, so no window is opened.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+# Render without a window; must be set before pygame initializes the display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "Game_Code"))
+
+import numpy as np
+
+import engine
+import generation
+from enemies import EnemyStore
+
+SEEDS = (1, 42, 1234, 31337, 99999)  # Fixed seed set shared by every benchmark
+MAP_SIZES = ((20, 25), (80, 100), (320, 400))  # (rows, cols) of generated terrain
+VIEW_SIZES = ((1000, 700), (1920, 1080))  # Window sizes for the render benchmark
+ENEMY_COUNTS = (10, 100, 1000, 10000)  # Enemies in the store for render and combat
+STRESS_COUNTS = (1000, 5000, 10000, 20000, 40000)  # Horde sizes for the stress-mode curve
+
+
+def measure(func, repeat):
+    """
+    Times repeated calls of a function.
+
+    Args:
+        func (callable): Function to call with no arguments.
+        repeat (int): Number of timed calls.
+
+    Returns:
+        dict: Mean, median and minimum time per call in milliseconds, and the
+        number of calls.
+    """
+    func()  # Warm up caches before timing
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        func()
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+    return {
+        "mean_ms": statistics.mean(samples),
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "runs": repeat,
+    }
+
+
+def bench_generation(repeat):
+    """
+    Times terrain generation for both terrain styles and every map size.
+
+    Each timed call generates the terrain of every seed in the seed set.
+
+    Args:
+        repeat (int): Number of timed calls per case.
+
+    Returns:
+        dict: Timings by case name.
+    """
+    results = {}
+    for lakes, style in ((False, "cluster"), (True, "lake")):
+        for rows, cols in MAP_SIZES:
+            def run():
+                for seed in SEEDS:
+                    generation.generate_terrain(seed, lakes, rows, cols)
+            results[f"generate_{style}_{rows}x{cols}"] = measure(run, repeat)
+    return results
+
+
+def bench_collision(repeat):
+    """
+    Times the water collision check on lake maps of every size.
+
+    Each timed call checks the same 1000 player-sized boxes, spread at random
+    (from a fixed seed) over the map, on the map of every seed in the seed set.
+
+    Args:
+        repeat (int): Number of timed calls per case.
+
+    Returns:
+        dict: Timings by case name.
+    """
+    results = {}
+    rng = random.Random(0)
+    for rows, cols in MAP_SIZES:
+        terrains = [generation.generate_terrain(seed, True, rows, cols) for seed in SEEDS]
+        tile_size = generation.TILE_SIZE
+        width, height = cols * tile_size[0], rows * tile_size[1]
+        boxes = [(rng.uniform(0, width), rng.uniform(0, height), 30, 40)
+                 for _ in range(1000)]
+
+        def run():
+            for terrain in terrains:
+                for box in boxes:
+                    engine.collides_with_water(terrain, box, tile_size,
+                                               engine.MAX_ALLOWED_WATER_COLLISIONS)
+        results[f"collision_{rows}x{cols}"] = measure(run, repeat)
+    return results
+
+
+def spawn_enemies(store, count, width, height, seed):
+    """
+    Fills an enemy store with randomly placed enemies.
+
+    Args:
+        store (EnemyStore): Store to add the enemies to.
+        count (int): Number of enemies to add.
+        width (int): Width of the area to place them in, in pixels.
+        height (int): Height of the area to place them in, in pixels.
+        seed (int): Seed for the placement.
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform((0, 0), (width, height), size=(count, 2))
+    store.spawn(positions, generation.ENEMY_HP)
+
+
+def bench_render(repeat):
+    """
+    Times drawing complete frames for every view size and enemy count, and
+    rebuilding the cached terrain for every view size.
+
+    Each timed call draws one frame of the map of every seed in the seed set,
+    or rebuilds the terrain of each of them.
+
+    Args:
+        repeat (int): Number of timed calls per case.
+
+    Returns:
+        dict: Timings by case name.
+    """
+    import pygame
+    from rendering import AssetCache, GameRenderer
+
+    pygame.display.init()
+    results = {}
+    try:
+        for view_size in VIEW_SIZES:
+            screen = pygame.display.set_mode(view_size)
+            assets = AssetCache(os.path.join(ROOT, "Assets"))
+            for count in ENEMY_COUNTS:
+                # One renderer per map, so each keeps its cached terrain
+                frames = []
+                for seed in SEEDS:
+                    state = engine.GameState(seed, view_size)
+                    state.world.enemies = EnemyStore()
+                    spawn_enemies(state.world.enemies, count, view_size[0], view_size[1],
+                                  seed + count)
+                    frames.append((GameRenderer(assets, state.player.get_inventory()), state))
+
+                def run():
+                    for renderer, state in frames:
+                        renderer.draw(screen, state, 0)
+                results[f"render_{view_size[0]}x{view_size[1]}_{count}_enemies"] = \
+                    measure(run, repeat)
+
+            # Rebuilding the cached terrain, as after Enter or a resize
+            def rebuild():
+                for renderer, _ in frames:
+                    renderer.terrain_layer.render(view_size)
+            results[f"render_terrain_{view_size[0]}x{view_size[1]}"] = measure(rebuild, repeat)
+    finally:
+        pygame.quit()
+    return results
+
+
+def bench_attack(repeat):
+    """
+    Times resolving weapon swings against stores of every enemy count.
+
+    Each timed call swings once from each of 100 fixed positions at the
+    enemies of every seed in the seed set, placed at random from that seed.
+    Enemies have enough HP not to die, so every call does the same work.
+
+    Args:
+        repeat (int): Number of timed calls per case.
+
+    Returns:
+        dict: Timings by case name.
+    """
+    results = {}
+    rng = random.Random(0)
+    origins = [(rng.uniform(0, 1000), rng.uniform(0, 700)) for _ in range(100)]
+    for count in ENEMY_COUNTS:
+        stores = []
+        for seed in SEEDS:
+            store = EnemyStore()
+            spawn_enemies(store, count, 1000, 700, seed + count)
+            store.hp[:] = store.max_hp[:] = 1e12  # Keep every enemy alive
+            stores.append(store)
+
+        def run():
+            for store in stores:
+                for x, y in origins:
+                    store.attack(x, y, 60, 25, 0)
+        results[f"attack_{count}_enemies"] = measure(run, repeat)
+    return results
+
+
+def bench_broadphase(repeat):
+    """
+    Times range and overlap queries as the number of interactables grows.
+
+    The enemies and chests are spread at a fixed density (one of each per
+    200x200 pixels), so the world grows with their number. Each timed call
+    runs 100 weapon reach, enemy contact and chest pickup queries at fixed
+    random points; with the spatial hash their cost should stay flat.
+
+    Args:
+        repeat (int): Number of timed calls per case.
+
+    Returns:
+        dict: Timings by case name.
+    """
+    results = {}
+    for count in ENEMY_COUNTS:
+        side = int(np.sqrt(count) * 200)
+        store = EnemyStore()
+        spawn_enemies(store, count, side, side, count)
+        rng = np.random.default_rng(count)
+        objects = [tuple(p) for p in rng.uniform(0, side, size=(count, 2)).tolist()]
+        world = generation.World(0, generation.new_terrain(1, 1), objects, store)
+        points = rng.uniform(0, side, size=(100, 2)).tolist()
+
+        def run():
+            for x, y in points:
+                store.in_range(x, y, 100)
+                store.touching(x, y, *engine.CHARACTER_SIZE, engine.ENEMY_SIZE)
+                world.object_grid.query(x - engine.OBJECT_SIZE[0], y - engine.OBJECT_SIZE[1],
+                                        engine.CHARACTER_SIZE[0] + engine.OBJECT_SIZE[0],
+                                        engine.CHARACTER_SIZE[1] + engine.OBJECT_SIZE[1])
+        results[f"broadphase_{count}_interactables"] = measure(run, repeat)
+    return results
+
+
+def bench_enemies(repeat):
+    """
+    Times moving every enemy toward the player along the flow field.
+
+    Each timed call simulates 60 ticks with the player walking in a loop, so
+    the flow field is recomputed whenever the player enters a new tile.
+
+    Args:
+        repeat (int): Number of timed calls per case.
+
+    Returns:
+        dict: Timings by case name.
+    """
+    results = {}
+    moves = ([engine.Inputs(right=True)] * 15 + [engine.Inputs(down=True)] * 15 +
+             [engine.Inputs(left=True)] * 15 + [engine.Inputs(up=True)] * 15)
+    for count in ENEMY_COUNTS:
+        state = engine.GameState(SEEDS[0])
+        state.player.x, state.player.y = 480, 300
+        state.world.enemies = EnemyStore()
+        spawn_enemies(state.world.enemies, count, 940, 640, count)
+
+        def run():
+            for inputs in moves:
+                state.step(inputs)
+        results[f"enemies_{count}_enemies"] = measure(run, repeat)
+    return results
+
+
+def bench_stress(repeat):
+    """
+    Times whole stress-mode frames as the horde grows, for a scaling curve.
+
+    Each case spawns a horde of wandering enemies around the player in an
+    infinite world, and each timed call is one frame: a tick with the player
+    walking right, then drawing it at the default window size.
+
+    Args:
+        repeat (int): Number of timed frames per case.
+
+    Returns:
+        dict: Timings by case name.
+    """
+    import pygame
+    from rendering import AssetCache, GameRenderer
+
+    pygame.display.init()
+    results = {}
+    try:
+        view_size = (1000, 700)
+        screen = pygame.display.set_mode(view_size)
+        renderer = None
+        for count in STRESS_COUNTS:
+            state = engine.GameState(SEEDS[0], view_size, infinite=True)
+            state.spawn_horde(count)
+            if renderer is None:
+                renderer = GameRenderer(AssetCache(os.path.join(ROOT, "Assets")),
+                                        state.player.get_inventory())
+            clock = [0]
+
+            def frame():
+                state.step(engine.Inputs(right=True))
+                clock[0] += 16
+                renderer.draw(screen, state, clock[0])
+            results[f"stress_{count}_enemies"] = measure(frame, repeat)
+            state.close()
+    finally:
+        pygame.quit()
+    return results
+
+
+def bench_replays(paths, repeat):
+    """
+    Times replaying recorded play sessions headless.
+
+    Args:
+        paths (list): Recording files written by main.py --record.
+        repeat (int): Number of timed replays per recording.
+
+    Returns:
+        dict: Timings by case name.
+    """
+    from replay import Recording, replay
+
+    results = {}
+    for path in paths:
+        recording = Recording.load(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        results[f"replay_{name}"] = measure(lambda: replay(recording), repeat)
+    return results
+
+
+BENCHMARKS = {
+    "generation": bench_generation,
+    "collision": bench_collision,
+    "render": bench_render,
+    "attack": bench_attack,
+    "broadphase": bench_broadphase,
+    "enemies": bench_enemies,
+    "stress": bench_stress,
+}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares benchmark results against a saved baseline.
+
+    Medians are compared, since they are the least affected by outliers.
+
+    Args:
+        results (dict): Timings by case name from this run.
+        baseline (dict): Timings by case name from the baseline.
+        tolerance (float): Allowed slowdown as a fraction (0.2 allows 20%).
+
+    Returns:
+        list: Names of the cases that got slower than the tolerance allows.
+    """
+    regressions = []
+    for name, timing in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:40} {timing['median_ms']:10.3f} ms   (new)")
+            continue
+        change = timing["median_ms"] / before["median_ms"] - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:40} {timing['median_ms']:10.3f} ms   {change:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    """
+    Runs the benchmarks, then saves and/or compares the results.
+
+    Args:
+        argv (list): Command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit status: 1 if a regression was found, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths")
+    parser.add_argument("--only", choices=sorted(BENCHMARKS), action="append",
+                        help="run only this group (may be repeated)")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="timed runs per case (default: 20)")
+    parser.add_argument("--replay", metavar="FILE", action="append", default=[],
+                        help="also time replaying this recorded session (may be repeated)")
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a JSON file written by --out")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown before reporting a regression (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for group in args.only or list(BENCHMARKS):
+        results.update(BENCHMARKS[group](args.repeat))
+    results.update(bench_replays(args.replay, args.repeat))
+
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "seeds": list(SEEDS),
+                "results": results,
+            }, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than the baseline")
+            return 1
+    else:
+        for name, timing in sorted(results.items()):
+            print(f"{name:40} {timing['median_ms']:10.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,26 @@
 import unittest
+import json
+import subprocess
 import sys
 import os
+import tempfile
+
+import numpy
 
 # Get the absolute path to the Game_Code directory
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Game_Code")))
 
 import main  # Import the main module from the Game_Code directory
+import analysis
+import chunks
+import engine
+import generation
+import pathfinding
+import prefetch
+import profiling
+import replay
+import savegame
+import scheduler
 
 class TestGame(unittest.TestCase):
     
@@ -113,5 +128,635 @@ class TestGame(unittest.TestCase):
         p.attack(e)
         self.assertTrue(e.HP <= 0)  # Enemy should be defeated
 
+    def test_import_without_pygame(self):
+        """
+        Tests that importing the game module does not load pygame or open a window.
+        """
+        game_code = os.path.join(os.path.dirname(__file__), "..", "Game_Code")
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, main; print('pygame' in sys.modules)"],
+            cwd=game_code, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "False")
+
+    def test_world_generation_is_deterministic(self):
+        """
+        Tests that the same seed always generates the same map.
+        """
+        a = generation.generate_world(1234, lakes=True)
+        b = generation.generate_world(1234, lakes=True)
+        self.assertTrue((a.terrain == b.terrain).all())
+        self.assertEqual(a.object_positions, b.object_positions)
+        self.assertTrue((a.enemies.positions == b.enemies.positions).all())
+
+    def test_water_collision_matches_full_scan(self):
+        """
+        Tests that checking only the tiles under the box agrees with the
+        original scan of every tile with pygame.Rect.colliderect().
+        """
+        import random
+        import pygame
+        rng = random.Random(0)
+        for seed, view_size in ((1, (1000, 700)), (2, (1366, 768)), (3, (777, 555))):
+            terrain = generation.generate_world(seed, lakes=True).terrain
+            rows, cols = terrain.shape
+            tile_size = (view_size[0] / cols, view_size[1] / rows)
+            for _ in range(1000):
+                box = (rng.uniform(-50, view_size[0]), rng.uniform(-50, view_size[1]),
+                       rng.uniform(0, 90), rng.uniform(0, 90))
+                box_rect = pygame.Rect(box)
+                count = 0
+                for i in range(rows):
+                    for j in range(cols):
+                        if terrain[i, j] == generation.WATER and box_rect.colliderect(
+                                pygame.Rect(j * tile_size[0], i * tile_size[1], tile_size[0], tile_size[1])):
+                            count += 1
+                self.assertEqual(engine.collides_with_water(terrain, box, tile_size,
+                                                            engine.MAX_ALLOWED_WATER_COLLISIONS),
+                                 count > engine.MAX_ALLOWED_WATER_COLLISIONS, box)
+
+    def test_terrain_stamps_match_original_loops(self):
+        """
+        Tests that the vectorized water stamps and outlines match the
+        original tile-by-tile loops drawing from the same random numbers.
+        """
+        import random
+        GRASS, WATER, OUTLINE = generation.GRASS, generation.WATER, generation.OUTLINE
+        rows, cols = generation.MAP_ROWS, generation.MAP_COLS
+
+        def loop_clusters(grid, rng):
+            for _ in range(rng.randint(3, 5)):
+                size = rng.randint(2, 7)
+                x, y = rng.randint(0, cols - size), rng.randint(0, rows - size)
+                for i in range(y, y + size):
+                    for j in range(x, x + size):
+                        grid[i][j] = WATER
+
+        def loop_lakes(grid, rng):
+            for _ in range(rng.randint(3, 5)):
+                size = rng.randint(3, 7)
+                x, y = rng.randint(0, cols - size), rng.randint(0, rows - size)
+                if rng.random() < 0.5:
+                    radius = size // 2
+                    for i in range(rows):
+                        for j in range(cols):
+                            if (i - (y + radius)) ** 2 + (j - (x + radius)) ** 2 < radius ** 2:
+                                grid[i][j] = WATER
+                else:
+                    for i in range(y, y + size):
+                        for j in range(x, x + size):
+                            if rng.random() > 0.2:
+                                grid[i][j] = WATER
+
+        def loop_outlines(grid):
+            for i in range(rows):
+                for j in range(cols):
+                    if grid[i][j] == WATER:
+                        for n_i, n_j in ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)):
+                            if 0 <= n_i < rows and 0 <= n_j < cols and grid[n_i][n_j] == GRASS:
+                                grid[n_i][n_j] = OUTLINE
+
+        for seed in range(50):
+            for stamp, loop in ((generation.stamp_clusters, loop_clusters),
+                                (generation.stamp_lakes, loop_lakes)):
+                terrain = generation.new_terrain(rows, cols)
+                stamp(terrain, random.Random(seed))
+                generation.add_outlines(terrain)
+                expected = [[GRASS] * cols for _ in range(rows)]
+                loop(expected, random.Random(seed))
+                loop_outlines(expected)
+                self.assertEqual(terrain.tolist(), expected)
+                self.assertIn(OUTLINE, terrain)
+
+    def test_enemy_store_attack_order_and_compaction(self):
+        """
+        Tests that a swing hits only the first living enemy in reach, in spawn
+        order, and that compaction drops dead enemies once they have lingered.
+        """
+        from enemies import EnemyStore
+        store = EnemyStore()
+        # Out of reach, in reach, in reach and closer to the attacker, far away
+        store.spawn([(500, 500), (140, 100), (101, 101), (900, 900)], 10)
+        self.assertEqual(store.attack(100, 100, 60, 4, 0), 1)
+        self.assertEqual(store.hp.tolist(), [10, 6, 10, 10])
+        self.assertEqual(store.attack(100, 100, 60, 7, 5), 1)  # Drops below zero and dies
+        self.assertFalse(store.alive[1])
+        self.assertEqual(store.died_at.tolist(), [-1, 5, -1, -1])
+        self.assertEqual(store.attack(100, 100, 60, 1, 6), 2)  # The dead enemy is skipped
+        self.assertEqual(store.attack(300, 300, 60, 1, 7), -1)  # Nobody in reach
+
+        store.compact(5 + 399, 400)  # Still lingering
+        self.assertEqual(len(store), 4)
+        store.compact(5 + 400, 400)
+        self.assertEqual(store.ids.tolist(), [0, 2, 3])
+        self.assertEqual(store.positions.tolist(), [[500, 500], [101, 101], [900, 900]])
+        self.assertEqual(store.hp.tolist(), [10, 9, 10])
+        self.assertEqual(store.rows_by_id.tolist(), [0, -1, 1, 2])
+        # Lookups still find the remaining enemies at their new rows
+        self.assertEqual(store.attack(900, 900, 60, 1, 8), 2)
+        self.assertEqual(store.in_range(100, 100, 60).tolist(), [1])
+
+    def test_headless_step_moves_player(self):
+        """
+        Tests that the engine moves the player without a window.
+        """
+        state = engine.GameState(42)
+        state.world.terrain[:] = generation.GRASS  # Nothing to collide with
+        for _ in range(10):
+            state.step(engine.Inputs(right=True, down=True))
+        self.assertEqual(state.player.x, 10 * engine.PLAYER_SPEED)
+        self.assertEqual(state.player.y, 10 * engine.PLAYER_SPEED)
+        self.assertEqual(state.tick, 10)
+
+    def test_prefetched_world_matches_seed(self):
+        """
+        Tests that a map built in the background equals one generated directly.
+        """
+        prefetcher = prefetch.WorldPrefetcher(depth=2)
+        try:
+            world = prefetcher.take()
+            self.assertEqual(len(prefetcher.pending), 2)  # Replacement was queued
+        finally:
+            prefetcher.close()
+        expected = generation.generate_world(world.seed, lakes=True)
+        self.assertTrue((world.terrain == expected.terrain).all())
+        self.assertEqual(world.object_positions, expected.object_positions)
+
+    def test_seed_analysis_rejects_unreachable_content(self):
+        """
+        Tests region labeling and that maps with unreachable chests are re-rolled.
+        """
+        rng = numpy.random.default_rng(3)
+        mask = rng.random((15, 20)) < 0.6
+        labels, count = analysis.label_regions(mask)
+        self.assertEqual(labels.max(), count)
+        for region in range(1, count + 1):
+            start = tuple(numpy.argwhere(labels == region)[0])
+            reachable = pathfinding.distance_field(mask, start) >= 0
+            self.assertTrue((reachable == (labels == region)).all())
+
+        world = generation.generate_world(2)
+        self.assertTrue(analysis.analyze_world(world).playable)
+        # Wall off the first chest with water
+        x, y = world.object_positions[0]
+        col, row = x // 32, y // 32
+        world.terrain[max(0, row - 1):row + 4, max(0, col - 1):col + 4] = generation.WATER
+        world.terrain[row:row + 2, col:col + 2] = generation.GRASS
+        report = analysis.analyze_world(world)
+        self.assertEqual(report.reachable_objects, report.objects - 1)
+        self.assertFalse(report.playable)
+
+        # Re-rolling is deterministic and ends on a playable map
+        first, report = analysis.find_playable_world(1, lakes=True, budget_ms=1000)
+        self.assertTrue(report.playable)
+        self.assertEqual(first.seed, analysis.find_playable_world(1, lakes=True, budget_ms=1000)[0].seed)
+
+    def test_broad_phase_matches_brute_force(self):
+        """
+        Tests that spatial hash queries find the same enemies as checking every enemy.
+        """
+        from enemies import EnemyStore
+        from entities import in_reach
+        rng = numpy.random.default_rng(4)
+        store = EnemyStore()
+        store.spawn(rng.uniform(-500, 1500, (300, 2)), 10)
+        for tick in range(20):
+            rows = numpy.flatnonzero(rng.random(len(store)) < 0.5)
+            store.move(rows, rng.normal(0, 80, (len(rows), 2)))
+            store.alive &= rng.random(len(store)) < 0.97
+            store.compact(tick, 0)  # Removed enemies leave their buckets
+            x, y, reach = rng.uniform(-300, 1300), rng.uniform(-300, 1300), rng.uniform(10, 120)
+            positions = store.positions
+            expected = numpy.flatnonzero(store.alive & in_reach(x, y, reach, positions[:, 0], positions[:, 1]))
+            self.assertEqual(store.in_range(x, y, reach).tolist(), expected.tolist())
+            expected = numpy.flatnonzero(store.alive & (positions[:, 0] < x + 60) & (x < positions[:, 0] + 60) &
+                                         (positions[:, 1] < y + 80) & (y < positions[:, 1] + 60))
+            self.assertEqual(store.touching(x, y, 60, 80, engine.ENEMY_SIZE).tolist(), expected.tolist())
+        self.assertEqual(sum(len(bucket) for bucket in store.grid.buckets.values()), len(store))
+
+    def test_generation_stages_are_isolated(self):
+        """
+        Tests that each generation stage draws only from its own random stream,
+        so changing how later stages spawn never changes the earlier ones.
+        """
+        import random
+        from unittest import mock
+        from enemies import EnemyStore
+        for seed, lakes in ((77, True), (78, False)):
+            world = generation.generate_world(seed, lakes)
+            numpy.testing.assert_array_equal(world.terrain, generation.generate_terrain(seed, lakes))
+
+            # No objects or enemies: the terrain is unchanged
+            with mock.patch.object(generation, "generate_objects", lambda seed, free_tiles: []), \
+                    mock.patch.object(generation, "generate_enemies",
+                                      lambda seed, free_tiles: EnemyStore()):
+                bare = generation.generate_world(seed, lakes)
+            numpy.testing.assert_array_equal(bare.terrain, world.terrain)
+
+            # Enemies from another seed: the terrain and objects are unchanged
+            generate_enemies = generation.generate_enemies
+            with mock.patch.object(generation, "generate_enemies",
+                                   lambda seed, free_tiles: generate_enemies(seed + 1, free_tiles)):
+                changed = generation.generate_world(seed, lakes)
+            numpy.testing.assert_array_equal(changed.terrain, world.terrain)
+            self.assertEqual(changed.object_positions, world.object_positions)
+
+            # The global random module is never drawn from
+            random.seed(0)
+            first = generation.generate_world(seed, lakes)
+            random.seed(1)
+            second = generation.generate_world(seed, lakes)
+            self.assertEqual(first.object_positions, second.object_positions)
+            numpy.testing.assert_array_equal(first.enemies.positions, second.enemies.positions)
+
+    def test_spawns_use_free_tiles(self):
+        """
+        Tests that objects and enemies spawn on distinct walkable tiles, even on water-heavy maps.
+        """
+        import random
+        free = generation.FreeTiles(numpy.array([[0, 1, 1], [1, 1, 2]], dtype=numpy.uint8))
+        self.assertEqual(len(free), 2)
+        self.assertTrue(free.claim(0, 0))
+        self.assertFalse(free.claim(0, 0))  # Already taken
+        self.assertFalse(free.claim(0, 1))  # Water
+        self.assertEqual(free.sample(random.Random(0), spacing=0), (1, 2))
+        self.assertIsNone(free.sample(random.Random(0)))
+
+        for seed in range(200):
+            world = generation.generate_world(seed, lakes=seed % 2 == 1)
+            positions = world.object_positions + [tuple(p) for p in world.enemies.positions.tolist()]
+            tiles = [(int(y) // 32, int(x) // 32) for x, y in positions]
+            self.assertEqual(len(set(tiles)), len(tiles))
+            for row, col in tiles:
+                self.assertNotEqual(world.terrain[row, col], generation.WATER)
+
+        # A map that is almost all water still spawns on its only dry tiles
+        terrain = numpy.full((20, 25), generation.WATER, dtype=numpy.uint8)
+        terrain[5, 5] = terrain[15, 20] = generation.GRASS
+        free = generation.FreeTiles(terrain)
+        objects = generation.generate_objects(3, free)
+        enemies = generation.generate_enemies(3, free)
+        self.assertEqual(len(objects) + len(enemies), 2)
+
+    def test_chunks_regenerate_identically(self):
+        """
+        Tests that an evicted chunk comes back exactly as it was generated.
+        """
+        chunk_world = chunks.ChunkWorld(5, max_chunks=4)
+        first = chunk_world.get(3, -2)
+        terrain = first.terrain.copy()
+        for cx in range(10):  # Push the chunk out of the cache
+            chunk_world.get(cx, 10)
+        self.assertLessEqual(len(chunk_world.chunks), 4)
+        self.assertNotIn((3, -2), chunk_world.chunks)
+        again = chunk_world.get(3, -2)
+        self.assertIsNot(again, first)
+        self.assertTrue((again.terrain == terrain).all())
+        self.assertEqual(again.object_positions, first.object_positions)
+
+    def test_enemy_changes_chunk_when_walking_across_border(self):
+        """
+        Tests that an enemy chasing the player into another chunk joins that
+        chunk, so it is drawn and can be hit after its first chunk is off screen.
+        """
+        state = engine.GameState(5, (400, 300), infinite=True)
+        for chunk in state.chunks.around(800, 190):
+            chunk.terrain[:] = generation.GRASS  # An open field, without other enemies
+            chunk.enemies.select(numpy.zeros(len(chunk.enemies), dtype=bool))
+        state.player.x, state.player.y = 800, 190
+        first, second = state.chunks.get(0, 0), state.chunks.get(1, 0)
+        first.enemies.spawn([(500, 200)], generation.ENEMY_HP)
+        for _ in range(100):
+            state.step(engine.Inputs())
+            if len(second.enemies) and second.enemies.positions[0, 0] >= 600:
+                break
+        self.assertEqual(len(first.enemies), 0)
+        self.assertEqual(len(second.enemies), 1)
+
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        import pygame
+        import rendering
+        pygame.display.init()
+        try:
+            screen = pygame.display.set_mode((400, 300))
+            renderer = rendering.GameRenderer(
+                rendering.AssetCache(os.path.join(os.path.dirname(__file__), "..", "Assets")),
+                state.player.get_inventory())
+            renderer.draw(screen, state, 0)
+            self.assertNotIn(first, renderer.visible_areas(state, renderer.camera(state, (400, 300)),
+                                                           (400, 300)))
+            self.assertTrue(any(img in renderer.enemy_imgs for img, _ in renderer.last_sprites))
+        finally:
+            pygame.quit()
+
+        for _ in range(100):
+            state.step(engine.Inputs(attack=True))
+        self.assertLess(second.enemies.hp[0], generation.ENEMY_HP)
+        state.close()
+
+    def test_infinite_world_memory_is_bounded(self):
+        """
+        Tests that walking far in infinite mode keeps a bounded number of chunks.
+        """
+        state = engine.GameState(9, infinite=True)
+        state.chunks.max_chunks = 16
+        for _ in range(50):
+            state.player.x += 1000  # Teleport across many chunks
+            state.step(engine.Inputs(right=True))
+        self.assertLessEqual(len(state.chunks.chunks), 16)
+
+    def test_room_transition_keeps_visited_rooms(self):
+        """
+        Tests that leaving and re-entering a room returns to the same room state.
+        """
+        state = engine.GameState(3, rooms=True)
+        try:
+            start = state.world
+            start.object_collided[0] = True  # Open a chest
+            state.player.y = state.view_size[1] // 2 - engine.CHARACTER_SIZE[1] // 2
+            state.step(engine.Inputs(left=True))  # Walk out through the west exit
+            self.assertEqual((state.rooms.current.rx, state.rooms.current.ry), (-1, 0))
+            self.assertIsNot(state.world, start)
+            state.player.x = state.view_size[0] - engine.CHARACTER_SIZE[0]
+            state.step(engine.Inputs(right=True))  # And back through the east exit
+            self.assertIs(state.world, start)
+            self.assertTrue(state.world.object_collided[0])
+        finally:
+            state.close()
+
+    def test_benchmark_baseline_roundtrip(self):
+        """
+        Tests that benchmark results saved as a baseline can be compared against.
+        """
+        benchmark = os.path.join(os.path.dirname(__file__), "benchmark.py")
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = os.path.join(tmp, "baseline.json")
+            subprocess.run([sys.executable, benchmark, "--only", "attack", "--repeat", "1",
+                            "--out", baseline], capture_output=True, check=True)
+            with open(baseline) as file:
+                self.assertIn("attack_10_enemies", json.load(file)["results"])
+            result = subprocess.run([sys.executable, benchmark, "--only", "attack", "--repeat", "1",
+                                     "--baseline", baseline, "--tolerance", "1000"],
+                                    capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stdout)
+
+    def test_fixed_timestep_is_independent_of_frame_rate(self):
+        """
+        Tests that the same real time yields the same ticks at any frame rate, up to the cap.
+        """
+        fast = engine.FixedTimestep(tick_rate=60)
+        slow = engine.FixedTimestep(tick_rate=60)
+        self.assertEqual(sum(fast.advance(1 / 240) for _ in range(240)), 60)
+        self.assertEqual(sum(slow.advance(1 / 20) for _ in range(20)), 60)
+        stalled = engine.FixedTimestep(tick_rate=60, max_steps=5)
+        self.assertEqual(stalled.advance(1.0), 5)  # A one second stall is dropped
+        self.assertEqual(stalled.dropped, 55)
+        self.assertEqual(engine.FixedTimestep(tick_rate=60, speed=4).advance(1 / 20), 12)
+
+    def test_recorded_session_replays_identically(self):
+        """
+        Tests that replaying a saved recording reproduces every tick's state.
+        """
+        state = engine.GameState(21, rooms=True)
+        recording = replay.Recording(21, "rooms", state.view_size)
+        live_hashes = []
+        try:
+            for tick in range(300):
+                inputs = engine.Inputs(right=tick < 200, down=tick % 50 < 20, attack=tick % 7 == 0,
+                                       weapon=(tick // 60) % 4 if tick % 60 == 0 else None)
+                if tick == 150:
+                    state.regenerate(77)
+                    recording.regenerate(77)
+                recording.record(inputs)
+                state.step(inputs)
+                live_hashes.append(replay.state_hash(state))
+        finally:
+            state.close()
+        self.assertEqual(len(recording.ticks), 300)  # One byte per tick
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "session.rpgr")
+            recording.save(path)
+            loaded = replay.Recording.load(path)
+        replayed_hashes = []
+        replay.replay(loaded, lambda state: replayed_hashes.append(replay.state_hash(state)))
+        self.assertEqual(replayed_hashes, live_hashes)
+
+    def test_save_and_load_restores_changes(self):
+        """
+        Tests that a saved game loads with the same chests, enemies, player and room.
+        """
+        state = engine.GameState(8, rooms=True)
+        try:
+            state.regenerate(31)  # A map made with Enter
+            state.world.object_collided[0] = True
+            state.world.enemies.hp[0] = 4.5
+            state.world.enemies.alive[-1] = False  # Defeated
+            state.world.enemies.positions[0] += (7, -3)  # Moved
+            state.player.x, state.player.y = 120, 340
+            state.player.set_tool(2)
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "game.sav")
+                savegame.save_game(state, path)
+                self.assertLess(os.path.getsize(path), 100)
+                loaded = savegame.load_game(path)
+        finally:
+            state.close()
+        try:
+            self.assertEqual(loaded.seed, 31)
+            self.assertTrue((loaded.world.terrain == state.world.terrain).all())
+            self.assertEqual(loaded.world.object_collided, state.world.object_collided)
+            alive = state.world.enemies.alive
+            self.assertEqual(loaded.world.enemies.ids.tolist(), state.world.enemies.ids[alive].tolist())
+            self.assertEqual(loaded.world.enemies.hp.tolist(), state.world.enemies.hp[alive].tolist())
+            self.assertEqual(loaded.world.enemies.positions.tolist(),
+                             state.world.enemies.positions[alive].tolist())
+            self.assertEqual((loaded.player.x, loaded.player.y), (120, 340))
+            self.assertIs(loaded.player.get_tool(), loaded.player.get_inventory()[2])
+        finally:
+            loaded.close()
+
+    def test_flow_field_leads_around_water(self):
+        """
+        Tests that the distance field walks around water and enemies follow it.
+        """
+        walkable = numpy.ones((5, 5), dtype=bool)
+        walkable[:4, 2] = False  # A wall of water with a gap at the bottom
+        distances = pathfinding.distance_field(walkable, (0, 0))
+        self.assertEqual(distances[0, 4], 12)
+        self.assertEqual(distances[1, 2], -1)
+        flow = pathfinding.FlowField()
+        flow.set_grid(walkable)
+        flow.set_target(0, 0)
+        self.assertFalse(flow.set_target(0, 0))  # Same tile, nothing to recompute
+        rows, cols, moving = flow.steer(numpy.array([0, 0]), numpy.array([3, 0]))
+        self.assertEqual((rows[0], cols[0]), (1, 3))  # Down toward the gap, not into water
+        self.assertFalse(moving[1])  # Already at the target
+
+    def test_update_scheduler_levels_and_budget(self):
+        """
+        Tests that distant enemies update less often and the per-tick budget is kept.
+        """
+        sched = scheduler.UpdateScheduler(periods=(1, 4, 16), distances=(600, 1200), budget=4)
+        centers = numpy.array([(100.0, 100.0), (900.0, 0.0), (5000.0, 0.0)])
+        levels = sched.levels(centers, (0, 0), (-500, -350, 1000, 700))
+        self.assertEqual(levels.tolist(), [0, 1, 2])
+
+        ids = numpy.arange(3)
+        idle = numpy.zeros(3, dtype=int)
+        updates = numpy.zeros(3, dtype=int)
+        for tick in range(32):
+            idle += 1
+            (chosen,) = sched.plan(tick, [(ids, levels, idle)])
+            updates[chosen] += 1
+            idle[chosen] = 0
+        self.assertEqual(updates.tolist(), [32, 8, 2])
+
+        crowd = numpy.arange(10)
+        (chosen,) = sched.plan(0, [(crowd, numpy.zeros(10, dtype=int), numpy.arange(10))])
+        self.assertEqual(sorted(chosen.tolist()), [6, 7, 8, 9])  # Longest waiting first
+        self.assertEqual(sched.deferred, 6)
+
+    def test_frame_profiler_percentiles_and_export(self):
+        """
+        Tests that the frame profiler records phase times and exports them.
+        """
+        profiler = profiling.FrameProfiler(("a", "b"), window=4, keep_history=True)
+        for _ in range(6):
+            profiler.begin()
+            profiler.lap("a")
+            profiler.lap("b")
+            profiler.lap("a")
+            profiler.end()
+        self.assertEqual(profiler.frames, 6)
+        self.assertEqual(len(profiler.recent()), 4)
+        stats = profiler.percentiles()
+        self.assertEqual(set(stats), {"a", "b", "frame"})
+        self.assertLessEqual(stats["a"][0], stats["a"][2])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "frames.csv")
+            profiler.export(path)
+            with open(path) as file:
+                rows = file.read().splitlines()
+        self.assertEqual(rows[0], "frame,a,b,total")
+        self.assertEqual(len(rows), 7)
+
+    def test_dirty_rect_frames_match_full_redraw(self):
+        """
+        Tests that redrawing only changed areas produces the same frames as full redraws.
+        """
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        import pygame
+        import rendering
+        pygame.display.init()
+        try:
+            pygame.display.set_mode((1000, 700))
+            assets = rendering.AssetCache(os.path.join(os.path.dirname(__file__), "..", "Assets"))
+            state = engine.GameState(5)
+            full = rendering.GameRenderer(assets, state.player.get_inventory())
+            dirty = rendering.GameRenderer(assets, state.player.get_inventory(), dirty_rects=True)
+            full_screen = pygame.Surface((1000, 700)).convert()
+            dirty_screen = pygame.Surface((1000, 700)).convert()
+            for tick in range(120):
+                target_x, target_y = state.world.enemies.positions[0]
+                state.step(engine.Inputs(right=state.player.x < target_x, down=state.player.y < target_y,
+                                         attack=True))
+                full.draw(full_screen, state, tick * 16)
+                dirty.draw(dirty_screen, state, tick * 16)
+                self.assertEqual(pygame.image.tostring(full_screen, "RGB"),
+                                 pygame.image.tostring(dirty_screen, "RGB"))
+        finally:
+            pygame.quit()
+
+    def test_atlas_terrain_matches_tile_blits(self):
+        """
+        Tests that drawing terrain from the atlas matches blitting each tile image.
+        """
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        import pygame
+        import rendering
+        pygame.display.init()
+        try:
+            pygame.display.set_mode((1000, 700))
+            assets = rendering.AssetCache(os.path.join(os.path.dirname(__file__), "..", "Assets"))
+            tile_imgs = [assets.get('grass.png', alpha=False), assets.get('water.png', alpha=False),
+                         assets.get('water_outline.png', generation.TILE_SIZE, False)]
+            terrain = generation.generate_world(7, lakes=True).terrain
+            tiled = pygame.Surface((800, 640)).convert()
+            for (row, col), kind in numpy.ndenumerate(terrain):
+                tiled.blit(tile_imgs[kind], (col * 32, row * 32))
+            atlas = pygame.Surface((800, 640)).convert()
+            rendering.TerrainTiles(generation.TILE_SIZE, tile_imgs).draw(atlas, terrain, (0, 0), [(0, 0)])
+            self.assertEqual(pygame.image.tostring(tiled, "RGB"), pygame.image.tostring(atlas, "RGB"))
+
+            # Variants and decorations only ever replace or cover grass tiles
+            tiles = rendering.TerrainTiles(generation.TILE_SIZE, tile_imgs,
+                                           [assets.get('grass_a.png', generation.TILE_SIZE, False)],
+                                           [assets.get('tree1.png', generation.TILE_SIZE)])
+            ground, decorations = tiles.blit_sequences(terrain, (0, 0), [(0, 0)], (800, 640))
+            self.assertEqual(len(ground), terrain.size)
+            for _, (x, y), area in ground + decorations:
+                if terrain[y // 32, x // 32] != generation.GRASS:
+                    self.assertEqual(area, tiles.ground.areas[terrain[y // 32, x // 32]])
+        finally:
+            pygame.quit()
+
+    def test_stress_horde_wanders_and_is_culled(self):
+        """
+        Tests that a stress-mode horde spawns and wanders on walkable tiles,
+        deterministically, that each new room gets one, and that only enemies
+        near the view are drawn.
+        """
+        rooms = engine.GameState(5, rooms=True)
+        try:
+            rooms.spawn_horde(500)
+            first = rooms.world
+            rooms.enter_room("e")
+            self.assertGreaterEqual(len(rooms.world.enemies), 500)
+            rooms.enter_room("w")
+            self.assertIs(rooms.world, first)
+            self.assertLess(len(first.enemies), 1000)  # Only one horde per room
+        finally:
+            rooms.close()
+
+        states = [engine.GameState(5, infinite=True) for _ in range(2)]
+        try:
+            for state in states:
+                state.spawn_horde(2000)
+                for _ in range(30):
+                    state.step(engine.Inputs())  # The player stands still, so the flow grid stays put
+            state = states[0]
+            positions = [numpy.concatenate([chunk.enemies.positions for chunk in s.chunks.chunks.values()])
+                         for s in states]
+            self.assertGreaterEqual(len(positions[0]), 2000)  # The horde and the chunks' own enemies
+            numpy.testing.assert_array_equal(positions[0], positions[1])
+
+            # Every enemy stands on a walkable tile
+            centers = positions[0] + numpy.array(engine.ENEMY_SIZE) / 2
+            rows = (centers[:, 1] // generation.TILE_SIZE[1]).astype(int)
+            cols = (centers[:, 0] // generation.TILE_SIZE[0]).astype(int)
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                self.assertNotEqual(state.chunks.tile(row, col), generation.WATER)
+        finally:
+            for state in states:
+                state.close()
+
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        import pygame
+        import rendering
+        pygame.display.init()
+        try:
+            screen = pygame.display.set_mode((1000, 700))
+            renderer = rendering.GameRenderer(
+                rendering.AssetCache(os.path.join(os.path.dirname(__file__), "..", "Assets")),
+                state.player.get_inventory())
+            renderer.draw(screen, state, 0)
+            camera = renderer.camera(state, (1000, 700))
+            drawn = [rect for img, rect in renderer.last_sprites if img in renderer.enemy_imgs]
+            on_screen = [(x, y) for x, y in positions[0] - camera
+                         if -60 < x < 1000 and -60 < y < 700]
+            self.assertGreaterEqual(len(drawn), len(on_screen))
+            self.assertLess(len(drawn), len(positions[0]))
+        finally:
+            pygame.quit()
+
 if __name__ == '__main__':
     unittest.main()